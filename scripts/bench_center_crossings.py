@@ -0,0 +1,52 @@
+import argparse
+import time
+
+import numpy as np
+
+from dosedynamics.analysis.center_crossings import count_center_crossings
+
+
+def _reference_crossings(ic: np.ndarray) -> int:
+    # Previous per-entry rescan, kept here as the baseline.
+    entries = np.where(ic[1:] & ~ic[:-1])[0]
+    exits = np.where(~ic[1:] & ic[:-1])[0]
+    crossings = 0
+    for e in entries:
+        later_exits = exits[exits > e]
+        if len(later_exits) == 0:
+            continue
+        if len(entries[entries > later_exits[0]]) > 0:
+            crossings += 1
+    return crossings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=54_000)
+    parser.add_argument("--switch-prob", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sessions = [
+        np.cumsum(rng.random(args.frames) < args.switch_prob) % 2 == 1
+        for _ in range(args.sessions)
+    ]
+
+    start = time.perf_counter()
+    reference = [_reference_crossings(ic) for ic in sessions]
+    t_reference = time.perf_counter() - start
+
+    start = time.perf_counter()
+    offsets = np.r_[0, np.cumsum([len(ic) for ic in sessions])]
+    _, _, crossings = count_center_crossings(np.concatenate(sessions), offsets)
+    t_batched = time.perf_counter() - start
+
+    assert crossings.tolist() == reference
+    print(f"{args.sessions} sessions x {args.frames} frames, {reference[0]} crossings")
+    print(f"reference: {t_reference:.3f}s  batched: {t_batched:.4f}s")
+    print(f"speedup: {t_reference / t_batched:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
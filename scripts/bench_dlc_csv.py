@@ -0,0 +1,57 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dosedynamics.io.loaders import load_dlc_csv
+
+
+def _write_csv(path: Path, frames: int, body_parts: int) -> None:
+    rng = np.random.default_rng(0)
+    cols = pd.MultiIndex.from_tuples(
+        [
+            ("DLC_resnet50", f"bp{i}", c)
+            for i in range(body_parts)
+            for c in ("x", "y", "likelihood")
+        ],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    df = pd.DataFrame(rng.uniform(0, 500, (frames, len(cols))), columns=cols)
+    df.to_csv(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=54_000)
+    parser.add_argument("--body-parts", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench_DLC_filtered.csv"
+        _write_csv(path, args.frames, args.body_parts)
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            reference = pd.read_csv(path, header=[0, 1, 2], index_col=0)
+        t_pandas = (time.perf_counter() - start) / args.repeats
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            df = load_dlc_csv(path)
+        t_arrow = (time.perf_counter() - start) / args.repeats
+
+        size_mb = path.stat().st_size / 1e6
+
+    np.testing.assert_allclose(df.to_numpy(), reference.to_numpy(), rtol=1e-6)
+    assert df.columns.equals(reference.columns)
+    print(f"{args.frames} frames x {args.body_parts} body parts ({size_mb:.0f} MB)")
+    print(f"pandas read_csv: {t_pandas:.3f}s  pyarrow: {t_arrow:.3f}s")
+    print(f"speedup: {t_pandas / t_arrow:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,22 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Tuple
 
 import numpy as np
 import pandas as pd
 
+ARREST_COLUMNS = ["start_frame", "end_frame", "duration_frames", "duration_s"]
 
-def detect_arrests_for_group(
+
+def still_mask(
     df_video: pd.DataFrame,
-    fps: float,
-    min_still_seconds: float,
     movement_threshold: float,
     likelihood_threshold: float,
-) -> pd.DataFrame:
+) -> np.ndarray:
+    n_frames = len(df_video)
     pose_cols = [c for c in df_video.columns if isinstance(c, tuple)]
     if not pose_cols:
-        return pd.DataFrame(
-            columns=["start_frame", "end_frame", "duration_frames", "duration_s"]
-        )
+        return np.zeros(n_frames, dtype=bool)
 
     pose_df = df_video[pose_cols].copy()
     cols = pose_df.columns
@@ -49,11 +48,8 @@ def detect_arrests_for_group(
         valid_mask[bp] = ~np.isnan(pos).any(axis=1)
 
     if not positions:
-        return pd.DataFrame(
-            columns=["start_frame", "end_frame", "duration_frames", "duration_s"]
-        )
+        return np.zeros(n_frames, dtype=bool)
 
-    n_frames = len(df_video)
     disp = np.zeros((n_frames, len(positions))) * np.nan
 
     for j, bp in enumerate(positions.keys()):
@@ -69,38 +65,62 @@ def detect_arrests_for_group(
     visible = ~np.isnan(disp)
     still_bp = np.where(visible, still_bp, True)
     visible_any = visible.any(axis=1)
-    all_still = np.all(still_bp, axis=1) & visible_any
-
+    return np.all(still_bp, axis=1) & visible_any
+
+
+def find_runs(
+    flags: np.ndarray, offsets: np.ndarray, min_length: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Runs of True in a concatenation of sessions; offsets[i]:offsets[i + 1]
+    # is session i, and runs never cross a session boundary. Returns the
+    # session index and session-relative start/end (inclusive) of each run.
+    flags = np.asarray(flags, dtype=bool)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(flags)
+    non_empty = offsets[1:] > offsets[:-1]
+    first = np.zeros(n, dtype=bool)
+    first[offsets[:-1][non_empty]] = True
+    last = np.zeros(n, dtype=bool)
+    last[offsets[1:][non_empty] - 1] = True
+
+    prev = np.r_[False, flags[:-1]]
+    nxt = np.r_[flags[1:], False]
+    starts = np.flatnonzero(flags & (~prev | first))
+    ends = np.flatnonzero(flags & (~nxt | last))
+
+    keep = ends - starts + 1 >= min_length
+    starts, ends = starts[keep], ends[keep]
+    session = np.searchsorted(offsets, starts, side="right") - 1
+    return session, starts - offsets[session], ends - offsets[session]
+
+
+def detect_arrests_batch(
+    flags: np.ndarray,
+    offsets: np.ndarray,
+    fps: float,
+    min_still_seconds: float,
+) -> pd.DataFrame:
     min_still_frames = int(round(min_still_seconds * fps))
-    arrests = []
-    in_arrest = False
-    start = None
-
-    for i, flag in enumerate(all_still):
-        if flag and not in_arrest:
-            in_arrest = True
-            start = i
-        elif not flag and in_arrest:
-            end = i - 1
-            if end - start + 1 >= min_still_frames:
-                arrests.append((start, end))
-            in_arrest = False
-
-    if in_arrest:
-        end = n_frames - 1
-        if end - start + 1 >= min_still_frames:
-            arrests.append((start, end))
-
-    rows = []
-    for s, e in arrests:
-        duration_frames = e - s + 1
-        rows.append(
-            {
-                "start_frame": s,
-                "end_frame": e,
-                "duration_frames": duration_frames,
-                "duration_s": duration_frames / fps,
-            }
-        )
-
-    return pd.DataFrame(rows)
+    session, start, end = find_runs(flags, offsets, min_still_frames)
+    duration_frames = end - start + 1
+    return pd.DataFrame(
+        {
+            "session": session,
+            "start_frame": start,
+            "end_frame": end,
+            "duration_frames": duration_frames,
+            "duration_s": duration_frames / fps,
+        }
+    )
+
+
+def detect_arrests_for_group(
+    df_video: pd.DataFrame,
+    fps: float,
+    min_still_seconds: float,
+    movement_threshold: float,
+    likelihood_threshold: float,
+) -> pd.DataFrame:
+    flags = still_mask(df_video, movement_threshold, likelihood_threshold)
+    arrests = detect_arrests_batch(flags, [0, len(flags)], fps, min_still_seconds)
+    return arrests[ARREST_COLUMNS]
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
-from dosedynamics.analysis.arrest import detect_arrests_for_group
+from dosedynamics.analysis.arrest import (
+    ARREST_COLUMNS,
+    detect_arrests_batch,
+    still_mask,
+)
 from dosedynamics.analysis.stats import perform_tests
 from dosedynamics.config import Config
-from dosedynamics.io.loaders import load_h5
+from dosedynamics.io.dataset import DatasetStore
 from dosedynamics.utils.paths import PathManager
 
 
+def _session_still(cfg: Config, g_time: pd.DataFrame) -> Tuple[np.ndarray, dict]:
+    flags = still_mask(
+        g_time,
+        movement_threshold=cfg.arrest.movement_threshold,
+        likelihood_threshold=cfg.preprocessing.likelihood_threshold,
+    )
+    meta = {col: g_time[col].iloc[0] for col in cfg.input.meta_cols}
+    return flags, meta
+
+
 @dataclass
 class ArrestResults:
     arrests: pd.DataFrame
@@ -22,50 +38,59 @@ class ArrestResults:
 
 
 class ArrestAnalysis:
-    def __init__(self, cfg: Config, logger) -> None:
+    def __init__(self, cfg: Config, logger, store: DatasetStore | None = None) -> None:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
+        self.store = store or DatasetStore(cfg, logger)
+
+    def cache_config(self) -> Dict[str, Any]:
+        return {
+            "input": self.cfg.input.model_dump(),
+            "preprocessing": self.cfg.preprocessing.model_dump(),
+            "arrest": self.cfg.arrest.model_dump(),
+            "arrest_analysis": self.cfg.analysis.arrest_analysis.model_dump(
+                include={"control_group", "paired"}
+            ),
+        }
 
     def run(self) -> ArrestResults:
-        data_full = load_h5(self.paths.resolve(self.cfg.input.h5_path))
         meta_cols = self.cfg.input.meta_cols
         group_cols = self.cfg.input.group_cols
         extra_cols = [c for c in meta_cols if c not in group_cols]
         group_by_cols = group_cols + extra_cols
 
-        arrest_list: List[pd.DataFrame] = []
+        flags_list: List[np.ndarray] = []
+        meta_list: List[dict] = []
         cutoff_frames = int(
             self.cfg.preprocessing.cutoff_minutes * 60 * self.cfg.preprocessing.fps
         )
-
-        for _, g in data_full.groupby(group_by_cols, sort=False):
-            g_time = g.head(cutoff_frames)
-            arrests = detect_arrests_for_group(
-                g_time,
-                fps=self.cfg.preprocessing.fps,
-                min_still_seconds=self.cfg.arrest.min_still_seconds,
-                movement_threshold=self.cfg.arrest.movement_threshold,
-                likelihood_threshold=self.cfg.preprocessing.likelihood_threshold,
-            )
-            if arrests.empty:
-                continue
-            for col in meta_cols:
-                arrests[col] = g_time[col].iloc[0]
-            arrest_list.append(arrests)
-
-        if arrest_list:
-            arrests_all = pd.concat(arrest_list, ignore_index=True)
-        else:
-            arrests_all = pd.DataFrame(
-                columns=[
-                    "start_frame",
-                    "end_frame",
-                    "duration_frames",
-                    "duration_s",
-                ]
-                + meta_cols
-            )
+        for flags, meta in self.store.map(
+            partial(_session_still, self.cfg),
+            full=True,
+            by=group_by_cols,
+            sort=False,
+            cutoff_frames=cutoff_frames,
+        ):
+            flags_list.append(flags)
+            meta_list.append(meta)
+
+        # One run-length pass over all sessions at once.
+        offsets = np.r_[0, np.cumsum([len(f) for f in flags_list])]
+        arrests = detect_arrests_batch(
+            np.concatenate(flags_list) if flags_list else np.zeros(0, dtype=bool),
+            offsets,
+            fps=self.cfg.preprocessing.fps,
+            min_still_seconds=self.cfg.arrest.min_still_seconds,
+        )
+        meta_df = pd.DataFrame(meta_list, columns=meta_cols)
+        arrests_all = pd.concat(
+            [
+                arrests[ARREST_COLUMNS],
+                meta_df.iloc[arrests["session"].to_numpy()].reset_index(drop=True),
+            ],
+            axis=1,
+        )
 
         if arrests_all.empty:
             empty_stats: list[dict] = []
@@ -1,18 +1,77 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from dosedynamics.analysis.stats import perform_tests
 from dosedynamics.config import Config
-from dosedynamics.io.loaders import load_h5
-from dosedynamics.preprocessing.bodypart import extract_body_part
+from dosedynamics.io.dataset import DatasetStore
+from dosedynamics.preprocessing.frame_features import first_valid
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
 from dosedynamics.utils.paths import PathManager
 
 
+def count_center_crossings(
+    in_center: np.ndarray, offsets: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Per-session entry, exit and crossing counts for concatenated sessions
+    # (session i is offsets[i]:offsets[i + 1]). A crossing is an entry that is
+    # followed by an exit and then by another entry in the same session.
+    ic = np.asarray(in_center, dtype=bool)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_sessions = len(offsets) - 1
+
+    # Transition i -> i + 1 is only valid when both frames share a session.
+    same = np.ones(max(len(ic) - 1, 0), dtype=bool)
+    bounds = offsets[1:-1]
+    same[bounds[(bounds > 0) & (bounds < len(ic))] - 1] = False
+
+    entries = np.flatnonzero(ic[1:] & ~ic[:-1] & same)
+    exits = np.flatnonzero(~ic[1:] & ic[:-1] & same)
+    entry_session = np.searchsorted(offsets, entries, side="right") - 1
+    exit_session = np.searchsorted(offsets, exits, side="right") - 1
+
+    n_entries = np.bincount(entry_session, minlength=n_sessions)
+    n_exits = np.bincount(exit_session, minlength=n_sessions)
+
+    last_entry = np.full(n_sessions, -1, dtype=np.int64)
+    np.maximum.at(last_entry, entry_session, entries)
+
+    crossed = np.zeros(len(entries), dtype=bool)
+    if len(exits):
+        next_exit = np.searchsorted(exits, entries, side="right")
+        has_exit = next_exit < len(exits)
+        next_exit = np.minimum(next_exit, len(exits) - 1)
+        crossed = (
+            has_exit
+            & (exit_session[next_exit] == entry_session)
+            & (last_entry[entry_session] > exits[next_exit])
+        )
+    n_crossings = np.bincount(entry_session[crossed], minlength=n_sessions)
+    return n_entries, n_exits, n_crossings
+
+
+def _session_metrics(cfg: Config, session: SessionTrajectory) -> Optional[dict]:
+    cutoff_frames = int(cfg.preprocessing.cutoff_minutes * 60 * cfg.preprocessing.fps)
+    g = first_valid(session, cutoff_frames)
+    if len(g) == 0:
+        return None
+    ic = g["in_center"][g.likelihood > cfg.preprocessing.likelihood_threshold]
+    entries, exits, crossings = count_center_crossings(ic, np.array([0, len(ic)]))
+    metrics = {
+        "center_entries": int(entries[0]),
+        "center_exits": int(exits[0]),
+        "center_crossings": int(crossings[0]),
+    }
+    for col in cfg.input.meta_cols:
+        metrics[col] = session.meta[col]
+    return metrics
+
+
 @dataclass
 class CenterCrossingsResults:
     per_group: pd.DataFrame
@@ -20,80 +79,30 @@ class CenterCrossingsResults:
 
 
 class CenterCrossingsAnalysis:
-    def __init__(self, cfg: Config, logger) -> None:
+    def __init__(self, cfg: Config, logger, store: DatasetStore | None = None) -> None:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
+        self.store = store or DatasetStore(cfg, logger)
 
-    def _compute_center_metrics(
-        self,
-        g: pd.DataFrame,
-        center_x_min: float,
-        center_x_max: float,
-        center_y_min: float,
-        center_y_max: float,
-    ) -> dict:
-        df2 = g[g["likelihood"] > self.cfg.preprocessing.likelihood_threshold].copy()
-        df2["in_center"] = (
-            (df2["x"] >= center_x_min)
-            & (df2["x"] <= center_x_max)
-            & (df2["y"] >= center_y_min)
-            & (df2["y"] <= center_y_max)
-        )
-
-        ic = df2["in_center"].values
-        entries = np.where(ic[1:] & ~ic[:-1])[0]
-        exits = np.where(~ic[1:] & ic[:-1])[0]
-
-        crossings = 0
-        for e in entries:
-            later_exits = exits[exits > e]
-            if len(later_exits) == 0:
-                continue
-            exit_frame = later_exits[0]
-            later_entries = entries[entries > exit_frame]
-            if len(later_entries) > 0:
-                crossings += 1
-
+    def cache_config(self) -> Dict[str, Any]:
         return {
-            "center_entries": len(entries),
-            "center_exits": len(exits),
-            "center_crossings": crossings,
+            "input": self.cfg.input.model_dump(),
+            "preprocessing": self.cfg.preprocessing.model_dump(),
+            "arena": self.cfg.arena.model_dump(),
+            "center_crossings": self.cfg.analysis.center_crossings.model_dump(
+                include={"control_group", "inner_frac"}
+            ),
         }
 
     def run(self) -> CenterCrossingsResults:
-        data_full = load_h5(self.paths.resolve(self.cfg.input.h5_path))
-        body_df = extract_body_part(
-            data_full,
-            body_part=self.cfg.input.body_part,
-            meta_cols=self.cfg.input.meta_cols,
-        )
-
-        cutoff_frames = int(
-            self.cfg.preprocessing.cutoff_minutes * 60 * self.cfg.preprocessing.fps
-        )
-        df_time = (
-            body_df[
-                body_df["likelihood"] >= self.cfg.preprocessing.likelihood_threshold
-            ]
-            .groupby(self.cfg.input.group_cols, group_keys=False)
-            .apply(lambda g: g.head(cutoff_frames))
-        )
-
-        inner_frac = self.cfg.analysis.center_crossings.inner_frac
-        center_x_min = (1 - inner_frac) / 2 * self.cfg.arena.width_cm
-        center_x_max = self.cfg.arena.width_cm - center_x_min
-        center_y_min = (1 - inner_frac) / 2 * self.cfg.arena.length_cm
-        center_y_max = self.cfg.arena.length_cm - center_y_min
-
-        results: List[dict] = []
-        for _, g in df_time.groupby(self.cfg.input.group_cols):
-            metrics = self._compute_center_metrics(
-                g, center_x_min, center_x_max, center_y_min, center_y_max
+        results: List[dict] = [
+            metrics
+            for metrics in self.store.map(
+                partial(_session_metrics, self.cfg), features=True
             )
-            for col in self.cfg.input.meta_cols:
-                metrics[col] = g[col].iloc[0]
-            results.append(metrics)
+            if metrics is not None
+        ]
 
         center_df = pd.DataFrame(results)
         groups = {
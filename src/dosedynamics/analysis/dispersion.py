@@ -1,19 +1,36 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from functools import partial
+from typing import Any, Dict, List
 
 import numpy as np
 import pandas as pd
 
 from dosedynamics.analysis.stats import get_cohens_d, perform_tests
 from dosedynamics.config import Config
-from dosedynamics.io.loaders import load_h5
-from dosedynamics.preprocessing.bodypart import extract_body_part
+from dosedynamics.io.dataset import DatasetStore
+from dosedynamics.preprocessing.frame_features import within_cutoff
 from dosedynamics.preprocessing.mec import mec_time_bins
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
 from dosedynamics.utils.paths import PathManager
 
 
+def _compute_mec(cfg: Config, session: SessionTrajectory) -> pd.DataFrame:
+    cutoff_frames = int(cfg.preprocessing.cutoff_minutes * 60 * cfg.preprocessing.fps)
+    mec = mec_time_bins(
+        within_cutoff(session, cutoff_frames).pose_frame(),
+        fps=cfg.preprocessing.fps,
+        bin_seconds=cfg.analysis.dispersion.bin_seconds,
+        max_minutes=None,
+        min_points=cfg.preprocessing.min_points,
+        likelihood_thresh=None,
+    )
+    for col in cfg.input.meta_cols:
+        mec[col] = session.meta[col]
+    return mec
+
+
 @dataclass
 class DispersionResults:
     per_bin: pd.DataFrame
@@ -21,35 +38,26 @@ class DispersionResults:
 
 
 class DispersionAnalysis:
-    def __init__(self, cfg: Config, logger) -> None:
+    def __init__(self, cfg: Config, logger, store: DatasetStore | None = None) -> None:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
+        self.store = store or DatasetStore(cfg, logger)
 
-    def _compute_mec(self, g: pd.DataFrame) -> pd.DataFrame:
-        mec = mec_time_bins(
-            g[["x", "y", "likelihood"]],
-            fps=self.cfg.preprocessing.fps,
-            bin_seconds=self.cfg.analysis.dispersion.bin_seconds,
-            max_minutes=self.cfg.preprocessing.cutoff_minutes,
-            min_points=self.cfg.preprocessing.min_points,
-            likelihood_thresh=self.cfg.preprocessing.likelihood_threshold,
-        )
-        for col in self.cfg.input.meta_cols:
-            mec[col] = g[col].iat[0]
-        return mec
+    def cache_config(self) -> Dict[str, Any]:
+        return {
+            "input": self.cfg.input.model_dump(),
+            "preprocessing": self.cfg.preprocessing.model_dump(),
+            "dispersion": self.cfg.analysis.dispersion.model_dump(
+                include={"control_group", "bin_seconds"}
+            ),
+        }
 
     def run(self) -> DispersionResults:
-        data_full = load_h5(self.paths.resolve(self.cfg.input.h5_path))
-        body_df = extract_body_part(
-            data_full,
-            body_part=self.cfg.input.body_part,
-            meta_cols=self.cfg.input.meta_cols,
-        )
-
         mec_list: List[pd.DataFrame] = []
-        for _, g in body_df.groupby(self.cfg.input.group_cols, sort=False):
-            out = self._compute_mec(g)
+        for out in self.store.map(
+            partial(_compute_mec, self.cfg), sort=False, features=True
+        ):
             if len(out):
                 mec_list.append(out)
 
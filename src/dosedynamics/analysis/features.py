@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Tuple
+from typing import Iterable, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
-from dosedynamics.analysis.arrest import detect_arrests_for_group
+from dosedynamics.preprocessing.frame_features import within_cutoff
 from dosedynamics.preprocessing.mec import mec_time_bins
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
+from dosedynamics.utils.segments import segment_offsets, segment_reduce
+
+BIN_FRAME_FEATURES = ["speed_cms", "dist_from_wall"]
 
 
 def build_feature_names(
@@ -18,105 +22,103 @@ def build_feature_names(
     return names
 
 
-def _group_key(row: pd.Series, group_cols: List[str]) -> Tuple[str, ...]:
-    return tuple(str(row[c]) for c in group_cols)
-
-
-def _group_key_from_df(df: pd.DataFrame, group_cols: List[str]) -> Tuple[str, ...]:
-    return tuple(str(df[c].iat[0]) for c in group_cols)
-
-
-def compute_stops_lookup(
-    data_full: pd.DataFrame,
-    group_cols: List[str],
-    fps: float,
-    cutoff_minutes: float,
-    stop_bin_seconds: float,
-    min_still_seconds: float,
-    movement_threshold: float,
-    likelihood_threshold: float,
-) -> Dict[Tuple[str, ...], pd.DataFrame]:
-    lookup: Dict[Tuple[str, ...], pd.DataFrame] = {}
-    cutoff_frames = int(cutoff_minutes * 60 * fps)
-    frames_per_bin = int(stop_bin_seconds * fps)
-
-    for _, g_full in data_full.groupby(group_cols):
-        g_time = g_full.head(cutoff_frames)
-        arrests = detect_arrests_for_group(
-            g_time,
-            fps=fps,
-            min_still_seconds=min_still_seconds,
-            movement_threshold=movement_threshold,
-            likelihood_threshold=likelihood_threshold,
-        )
-
-        n_bins = int(np.ceil(len(g_time) / frames_per_bin))
-        stops_per_bin = pd.DataFrame({"bin_id": np.arange(n_bins), "stops_per_bin": 0})
-
-        if not arrests.empty:
-            bin_ids = arrests["start_frame"] // frames_per_bin
-            counts = bin_ids.value_counts().to_dict()
-            for b, cnt in counts.items():
-                if b < n_bins:
-                    stops_per_bin.loc[stops_per_bin["bin_id"] == b, "stops_per_bin"] = (
-                        cnt
-                    )
-
-        lookup[_group_key_from_df(g_time, group_cols)] = stops_per_bin
-
-    return lookup
+def stops_per_bin(
+    session: np.ndarray,
+    start_frame: np.ndarray,
+    n_frames: np.ndarray,
+    frames_per_bin: int,
+) -> pd.DataFrame:
+    # Arrest starts counted per (session, bin) for all sessions at once; every
+    # bin of every session gets a row, including bins without stops.
+    n_frames = np.asarray(n_frames, dtype=np.int64)
+    n_bins = -(-n_frames // frames_per_bin)
+    bin_offsets = np.r_[0, np.cumsum(n_bins)]
+    session = np.asarray(session, dtype=np.int64)
+    global_bin = bin_offsets[session] + np.asarray(start_frame) // frames_per_bin
+    counts = np.bincount(global_bin, minlength=bin_offsets[-1])
+    session_of_bin = np.repeat(np.arange(len(n_bins)), n_bins)
+    return pd.DataFrame(
+        {
+            "session": session_of_bin,
+            "bin_id": np.arange(bin_offsets[-1]) - bin_offsets[session_of_bin],
+            "stops_per_bin": counts,
+        }
+    )
 
 
-def compute_bin_features(
-    g: pd.DataFrame,
-    stops_lookup: Dict[Tuple[str, ...], pd.DataFrame],
-    group_cols: List[str],
+def merge_stops(
+    bin_df: pd.DataFrame, stops: pd.DataFrame, meta_cols: List[str]
+) -> pd.DataFrame:
+    # bin_df and stops both carry a "session" column; stops_per_bin is placed
+    # before the metadata columns.
+    out = bin_df.merge(stops, on=["session", "bin_id"], how="left")
+    counts = out.pop("stops_per_bin").fillna(0)
+    out = out.drop(columns="session")
+    meta = [c for c in meta_cols if c in out.columns]
+    position = out.columns.get_loc(meta[0]) if meta else len(out.columns)
+    out.insert(position, "stops_per_bin", counts)
+    return out
+
+
+def session_bin_frames(
+    session: SessionTrajectory,
     meta_cols: List[str],
     fps: float,
     cutoff_minutes: float,
     bin_seconds: float,
-    likelihood_threshold: float,
     min_points: int,
-) -> pd.DataFrame:
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Per-frame inputs of one session's bin means, and its per-bin MEC radii
+    # with the session metadata.
     cutoff_frames = int(cutoff_minutes * 60 * fps)
     frames_per_bin = int(bin_seconds * fps)
 
-    g = g.head(cutoff_frames)
-    g = g[g["likelihood"] >= likelihood_threshold].copy()
+    g = within_cutoff(session, cutoff_frames)
     if len(g) < 2:
-        return pd.DataFrame()
-
-    g = g.reset_index(drop=True)
-
-    g["step_dist"] = np.sqrt(g["x"].diff() ** 2 + g["y"].diff() ** 2).fillna(0)
-    g["speed_cms"] = g["step_dist"] * fps
-    g["bin_id"] = g.index // frames_per_bin
-
-    speed_mean = g.groupby("bin_id")["speed_cms"].mean().rename("speed_cms")
-    dist_mean = g.groupby("bin_id")["dist_from_wall"].mean().rename("dist_from_wall")
-    agg = pd.concat([speed_mean, dist_mean], axis=1).reset_index()
-
-    mec_df = mec_time_bins(
-        g[["x", "y", "likelihood"]],
+        return pd.DataFrame(), pd.DataFrame()
+
+    frames = pd.DataFrame(
+        {
+            "bin_id": g["valid_rank"] // frames_per_bin,
+            "speed_cms": np.nan_to_num(g["speed"], nan=0.0),
+            "dist_from_wall": g["dist_from_wall"],
+        }
+    )
+    bins = mec_time_bins(
+        g.pose_frame(),
         fps=fps,
         bin_seconds=bin_seconds,
         max_minutes=None,
         min_points=min_points,
         likelihood_thresh=None,
-    ).rename(columns={"radius": "mec_radius"})
-    agg = agg.merge(mec_df[["bin_id", "mec_radius"]], on="bin_id", how="left")
-
-    group_key = _group_key_from_df(g, group_cols)
-    stops_df = stops_lookup.get(
-        group_key, pd.DataFrame(columns=["bin_id", "stops_per_bin"])
-    )
-    agg = agg.merge(stops_df, on="bin_id", how="left")
-    agg["stops_per_bin"] = agg["stops_per_bin"].fillna(0)
-
+    ).rename(columns={"radius": "mec_radius"})[["bin_id", "mec_radius"]]
     for col in meta_cols:
-        agg[col] = g[col].iat[0]
+        bins[col] = session.meta[col]
+    return frames, bins
 
-    return agg
+
+def compute_bin_features(
+    frames: pd.DataFrame,
+    bins: pd.DataFrame,
+    features: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    # frames and bins of all sessions, each carrying a "session" column;
+    # per-bin means come from one segment reduction across sessions.
+    features = list(features or BIN_FRAME_FEATURES)
+    session = frames["session"].to_numpy()
+    bin_id = frames["bin_id"].to_numpy()
+    offsets = segment_offsets(session, bin_id)
+    means = segment_reduce(frames[features].to_numpy(), offsets, ("mean",))["mean"]
+
+    first = offsets[:-1]
+    agg = pd.DataFrame({"bin_id": bin_id[first]})
+    for i, name in enumerate(features):
+        agg[name] = means[:, i]
+    agg["session"] = session[first]
+
+    out = agg.merge(bins, on=["session", "bin_id"], how="left")
+    out["session"] = out.pop("session")
+    return out
 
 
 def add_group_id(df: pd.DataFrame, group_cols: List[str], sep: str) -> pd.DataFrame:
@@ -1,16 +1,69 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from dosedynamics.analysis.stats import perform_tests
 from dosedynamics.config import Config
-from dosedynamics.io.loaders import load_h5
-from dosedynamics.preprocessing.bodypart import extract_body_part
+from dosedynamics.io.dataset import DatasetStore
+from dosedynamics.preprocessing.frame_features import within_cutoff
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
 from dosedynamics.utils.paths import PathManager
+from dosedynamics.utils.segments import segment_offsets, segment_reduce
+
+
+def _session_steps(
+    cfg: Config, session: SessionTrajectory
+) -> Optional[Tuple[pd.DataFrame, dict]]:
+    max_frames = int(cfg.preprocessing.cutoff_minutes * 60 * cfg.preprocessing.fps)
+    frames_per_bin = int(cfg.analysis.speed_bins.bin_seconds * cfg.preprocessing.fps)
+
+    g = within_cutoff(session, max_frames)
+    if len(g) < 2:
+        return None
+
+    step_dist = g["step_dist"].copy()
+    step_dist[0] = 0
+    steps = pd.DataFrame(
+        {
+            "bin_id": g["valid_rank"] // frames_per_bin,
+            "step_dist": step_dist,
+        }
+    )
+    return steps, session.meta
+
+
+def compute_bin_speeds(
+    steps: List[pd.DataFrame],
+    meta: List[dict],
+    meta_cols: List[str],
+    bin_seconds: float,
+) -> pd.DataFrame:
+    # One segment reduction over the steps of all sessions.
+    session = np.repeat(np.arange(len(steps)), [len(s) for s in steps])
+    bin_id = np.concatenate([s["bin_id"].to_numpy() for s in steps])
+    step_dist = np.concatenate([s["step_dist"].to_numpy() for s in steps])
+    offsets = segment_offsets(session, bin_id)
+    stats = segment_reduce(step_dist, offsets, ("sum", "count"))
+
+    first = offsets[:-1]
+    out = pd.DataFrame(
+        {
+            "bin_id": bin_id[first],
+            "total_distance": stats["sum"],
+            "n_frames": stats["count"],
+            "bin_speed": stats["sum"] / bin_seconds,
+        }
+    )
+    for col in meta_cols:
+        values = np.empty(len(meta), dtype=object)
+        values[:] = [m[col] for m in meta]
+        out[col] = values[session[first]]
+    return out
 
 
 @dataclass
@@ -20,62 +73,40 @@ class SpeedBinsResults:
 
 
 class SpeedBinsAnalysis:
-    def __init__(self, cfg: Config, logger) -> None:
+    def __init__(self, cfg: Config, logger, store: DatasetStore | None = None) -> None:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
-
-    def _compute_bin_speeds(self, g: pd.DataFrame) -> pd.DataFrame:
-        max_frames = int(
-            self.cfg.preprocessing.cutoff_minutes * 60 * self.cfg.preprocessing.fps
-        )
-        frames_per_bin = int(
-            self.cfg.analysis.speed_bins.bin_seconds * self.cfg.preprocessing.fps
-        )
-
-        g = g.head(max_frames)
-        g = g[g["likelihood"] >= self.cfg.preprocessing.likelihood_threshold].copy()
-        if len(g) < 2:
-            return pd.DataFrame()
-
-        g = g.reset_index(drop=True)
-        step_dist = np.sqrt(g["x"].diff() ** 2 + g["y"].diff() ** 2)
-        step_dist.iloc[0] = 0
-        g["step_dist"] = step_dist
-        g["bin_id"] = g.index // frames_per_bin
-
-        agg = (
-            g.groupby("bin_id")["step_dist"]
-            .agg(total_distance="sum", n_frames="count")
-            .reset_index()
-        )
-        agg["bin_speed"] = (
-            agg["total_distance"] / self.cfg.analysis.speed_bins.bin_seconds
-        )
-
-        for col in self.cfg.input.meta_cols:
-            agg[col] = g[col].iat[0]
-
-        return agg
+        self.store = store or DatasetStore(cfg, logger)
+
+    def cache_config(self) -> Dict[str, Any]:
+        return {
+            "input": self.cfg.input.model_dump(),
+            "preprocessing": self.cfg.preprocessing.model_dump(),
+            "speed_bins": self.cfg.analysis.speed_bins.model_dump(
+                include={"control_group", "bin_seconds"}
+            ),
+        }
 
     def run(self) -> SpeedBinsResults:
-        data_full = load_h5(self.paths.resolve(self.cfg.input.h5_path))
-        body_df = extract_body_part(
-            data_full,
-            body_part=self.cfg.input.body_part,
-            meta_cols=self.cfg.input.meta_cols,
-        )
-
-        bin_list: List[pd.DataFrame] = []
-        for _, g in body_df.groupby(self.cfg.input.group_cols, sort=False):
-            out = self._compute_bin_speeds(g)
-            if len(out):
-                bin_list.append(out)
-
-        if not bin_list:
+        steps: List[pd.DataFrame] = []
+        meta: List[dict] = []
+        for out in self.store.map(
+            partial(_session_steps, self.cfg), sort=False, features=True
+        ):
+            if out is not None:
+                steps.append(out[0])
+                meta.append(out[1])
+
+        if not steps:
             raise ValueError("No bin speeds computed; check input data and config")
 
-        bin_speeds = pd.concat(bin_list, ignore_index=True)
+        bin_speeds = compute_bin_speeds(
+            steps,
+            meta,
+            self.cfg.input.meta_cols,
+            self.cfg.analysis.speed_bins.bin_seconds,
+        )
         bin_speeds = bin_speeds.dropna(subset=["bin_speed"])
 
         groups = {
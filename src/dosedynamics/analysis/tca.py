@@ -1,38 +1,69 @@
 from __future__ import annotations
 
-from typing import Dict, List
+import warnings
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
+import pandas as pd
 import tensorly as tl
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
 from tensorly.decomposition import parafac
 
+from dosedynamics.io.shared import SharedArray, SharedArrayHandle, attach_array
+from dosedynamics.utils.parallel import (
+    ordered_map,
+    process_pool,
+    resolve_jobs,
+    submit,
+)
+
+# An init name understood by parafac, or (weights, factors) to start from.
+CPInit = Union[str, Tuple[np.ndarray, List[np.ndarray]]]
+
 
 def build_tensor(
     bin_df,
     features: List[str],
     group_id_col: str,
     bin_col: str,
+    masked: bool = False,
 ) -> tuple[np.ndarray, List[Dict[str, str]], List[str], int]:
-    groups = sorted(bin_df[group_id_col].unique().tolist())
-    n_bins = int(bin_df[bin_col].max()) + 1
+    gids = bin_df[group_id_col].to_numpy()
+    groups, first, group_idx = np.unique(gids, return_index=True, return_inverse=True)
+    groups = groups.tolist()
+    bin_idx = bin_df[bin_col].to_numpy().astype(np.int64)
+    n_bins = int(bin_idx.max()) + 1
     X = np.full((len(groups), n_bins, len(features)), np.nan)
 
-    meta = []
-    for i, gid in enumerate(groups):
-        sub = bin_df[bin_df[group_id_col] == gid]
-        meta.append(
-            {"group_id": gid, "concentration": str(sub["concentration"].iat[0])}
-        )
-        for _, row in sub.iterrows():
-            b = int(row[bin_col])
-            for feat_idx, feat in enumerate(features):
-                X[i, b, feat_idx] = row.get(feat, np.nan)
+    # Later rows for the same (group, bin) overwrite earlier ones.
+    key = group_idx * n_bins + bin_idx
+    _, last_rev = np.unique(key[::-1], return_index=True)
+    rows = len(key) - 1 - last_rev
+
+    cols = [i for i, f in enumerate(features) if f in bin_df.columns]
+    if cols:
+        values = bin_df[[features[i] for i in cols]].to_numpy(dtype=np.float64)
+        X[group_idx[rows][:, None], bin_idx[rows][:, None], cols] = values[rows]
 
+    concentration = bin_df["concentration"].to_numpy()[first]
+    meta = [
+        {"group_id": gid, "concentration": str(conc)}
+        for gid, conc in zip(groups, concentration)
+    ]
+
+    if masked:
+        X = np.ma.masked_invalid(X)
     return X, meta, features, n_bins
 
 
 def fill_tensor(X: np.ndarray, strategy: str, fill_value: float) -> np.ndarray:
     X_filled = X.copy()
+    if strategy == "mask":
+        # Missing entries stay NaN and are left out of the fit.
+        return X_filled
     if strategy != "median":
         raise ValueError(f"Unsupported fill strategy: {strategy}")
     for f in range(X.shape[2]):
@@ -44,16 +75,123 @@ def fill_tensor(X: np.ndarray, strategy: str, fill_value: float) -> np.ndarray:
     return X_filled
 
 
+def _masked_cp_init(
+    X: np.ndarray,
+    observed: np.ndarray,
+    rank: int,
+    init: CPInit,
+    random_state: Optional[int],
+) -> List[np.ndarray]:
+    if isinstance(init, str):
+        # Start from the tensor with each feature's median in the gaps.
+        start = np.where(observed, X, np.nan)
+        fill = np.nanmedian(start, axis=tuple(range(X.ndim - 1)), keepdims=True)
+        start = np.where(observed, X, np.nan_to_num(fill))
+        # parafac without iterations returns just its initialization.
+        init = parafac(start, rank, n_iter_max=0, init=init, random_state=random_state)
+    weights, factors = init
+    factors = [np.array(f, dtype=np.float64) for f in factors]
+    factors[-1] = factors[-1] * np.asarray(weights)
+    return factors
+
+
+def masked_cp_als(
+    X: np.ndarray,
+    rank: int,
+    max_iter: int,
+    tol: float,
+    init: CPInit,
+    normalize_factors: bool,
+    l2_reg: float,
+    random_state: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, List[np.ndarray]]:
+    # CP-ALS fitted to the observed (non-NaN) entries of X only, further
+    # restricted to mask if given. Every row of a factor solves its own normal
+    # equations over the entries observed in that row; the Gram matrices and
+    # the masked MTTKRP are sums over the observed index set, gathered per row
+    # with a sparse row indicator.
+    observed = ~np.isnan(X)
+    if mask is not None:
+        observed &= mask
+    coords = np.nonzero(observed)
+    values = X[observed]
+    n = len(values)
+    row_sums = [
+        sparse.csr_matrix((np.ones(n), (c, np.arange(n))), shape=(dim, n))
+        for c, dim in zip(coords, X.shape)
+    ]
+    factors = _masked_cp_init(X, observed, rank, init, random_state)
+    ridge = l2_reg * np.eye(rank)
+    norm = np.linalg.norm(values)
+
+    previous = None
+    for _ in range(max_iter):
+        for mode in range(X.ndim):
+            khatri_rao = np.ones((n, rank))
+            for other, factor in enumerate(factors):
+                if other != mode:
+                    khatri_rao *= factor[coords[other]]
+            outer = khatri_rao[:, :, None] * khatri_rao[:, None, :]
+            gram = (row_sums[mode] @ outer.reshape(n, -1)).reshape(-1, rank, rank)
+            mttkrp = row_sums[mode] @ (khatri_rao * values[:, None])
+            # pinv leaves rows without (enough) observations at zero.
+            solved = np.linalg.pinv(gram + ridge) @ mttkrp[:, :, None]
+            factors[mode] = solved[:, :, 0]
+
+        # khatri_rao still holds the other modes' rows for the last mode.
+        fitted = (khatri_rao * factors[-1][coords[-1]]).sum(axis=1)
+        error = np.linalg.norm(values - fitted) / norm
+        if previous is not None and abs(previous - error) < tol:
+            break
+        previous = error
+
+    weights = np.ones(rank)
+    if normalize_factors:
+        norms = [np.linalg.norm(f, axis=0) for f in factors]
+        weights = np.prod(norms, axis=0)
+        factors = [f / np.where(n > 0, n, 1.0) for f, n in zip(factors, norms)]
+    return weights, factors
+
+
 def run_tca(
     X: np.ndarray,
     rank: int,
     max_iter: int,
     tol: float,
-    init: str,
+    init: CPInit,
     normalize_factors: bool,
     l2_reg: float,
+    random_state: Optional[int] = None,
+    mask: Optional[np.ndarray] = None,
 ) -> tuple[np.ndarray, List[np.ndarray]]:
     tl.set_backend("numpy")
+    fit_kwargs = dict(
+        rank=rank,
+        max_iter=max_iter,
+        tol=tol,
+        init=init,
+        normalize_factors=normalize_factors,
+        l2_reg=l2_reg,
+        random_state=random_state,
+    )
+    # NaN entries (fill_strategy "mask") and entries outside mask are skipped
+    # by the masked solver.
+    if mask is not None or np.isnan(X).any():
+        return masked_cp_als(X, mask=mask, **fit_kwargs)
+    return _parafac(X, **fit_kwargs)
+
+
+def _parafac(
+    X: np.ndarray,
+    rank: int,
+    max_iter: int,
+    tol: float,
+    init: CPInit,
+    normalize_factors: bool,
+    l2_reg: float,
+    random_state: Optional[int] = None,
+) -> tuple[np.ndarray, List[np.ndarray]]:
     weights, factors = parafac(
         X,
         rank=rank,
@@ -62,5 +200,297 @@ def run_tca(
         tol=tol,
         normalize_factors=normalize_factors,
         l2_reg=l2_reg,
+        random_state=random_state,
     )
     return weights, factors
+
+
+def relative_error(
+    X: np.ndarray, weights: np.ndarray, factors: List[np.ndarray]
+) -> float:
+    # Measured on the observed entries when X has gaps.
+    residual = X - tl.cp_to_tensor((weights, factors))
+    observed = ~np.isnan(X)
+    if not observed.all():
+        return float(np.linalg.norm(residual[observed]) / np.linalg.norm(X[observed]))
+    return float(np.linalg.norm(residual) / np.linalg.norm(X))
+
+
+def _unit_columns(factor: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(factor, axis=0)
+    return factor / np.where(norms > 0, norms, 1.0)
+
+
+def align_factors(
+    reference: List[np.ndarray],
+    factors: List[np.ndarray],
+    weights: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, List[np.ndarray], float]:
+    # Permutes and flips the components of factors to best match reference.
+    # A component's similarity is the product over modes of the absolute
+    # cosine between matched columns; the score is its mean (1 = the same
+    # model up to scaling). Sign flips are moved into the weights.
+    cosines = [
+        _unit_columns(r).T @ _unit_columns(f) for r, f in zip(reference, factors)
+    ]
+    similarity = np.prod(np.abs(cosines), axis=0)
+    rows, cols = linear_sum_assignment(similarity, maximize=True)
+    signs = [np.where(c[rows, cols] < 0, -1.0, 1.0) for c in cosines]
+    aligned = [f[:, cols] * s for f, s in zip(factors, signs)]
+    if weights is None:
+        weights = np.ones(factors[0].shape[1])
+    aligned_weights = weights[cols] * np.prod(signs, axis=0)
+    return aligned_weights, aligned, float(similarity[rows, cols].mean())
+
+
+def _restart_init(init: str, restart: int) -> str:
+    # A deterministic init (svd) only needs one run; further restarts start
+    # from random factors.
+    return init if restart == 0 else "random"
+
+
+def _fit_restart(
+    X: np.ndarray, task: Tuple[int, CPInit], seed: int, **fit_kwargs
+) -> Tuple[np.ndarray, List[np.ndarray], float]:
+    restart, init = task
+    with warnings.catch_warnings():
+        # tensorly warns about normalizing when starting from given factors.
+        warnings.filterwarnings("ignore", message="It is not recommended")
+        weights, factors = run_tca(
+            X, init=init, random_state=seed + restart, **fit_kwargs
+        )
+    return weights, factors, relative_error(X, weights, factors)
+
+
+@dataclass
+class TCAFit:
+    weights: np.ndarray
+    factors: List[np.ndarray]
+    restarts: pd.DataFrame
+
+
+def _select_best(
+    fits: List[Tuple[np.ndarray, List[np.ndarray], float]],
+    inits: List[str],
+    seed: int,
+) -> TCAFit:
+    # The fit with the lowest relative reconstruction error wins; each
+    # restart's similarity is measured against it after alignment.
+    best = int(np.argmin([error for _, _, error in fits]))
+    best_weights, best_factors, _ = fits[best]
+    rows = []
+    for restart, (weights, factors, error) in enumerate(fits):
+        _, _, similarity = align_factors(best_factors, factors, weights)
+        rows.append(
+            {
+                "restart": restart,
+                "init": inits[restart],
+                "seed": seed + restart,
+                "error": error,
+                "similarity": similarity,
+                "best": restart == best,
+            }
+        )
+    return TCAFit(
+        weights=best_weights, factors=best_factors, restarts=pd.DataFrame(rows)
+    )
+
+
+def run_tca_restarts(
+    X: np.ndarray,
+    rank: int,
+    max_iter: int,
+    tol: float,
+    init: str,
+    normalize_factors: bool,
+    l2_reg: float,
+    n_restarts: int = 1,
+    n_jobs: int = 1,
+    seed: int = 0,
+) -> TCAFit:
+    # Restart i is seeded with seed + i; restarts run in n_jobs processes.
+    fit = partial(
+        _fit_restart,
+        X,
+        seed=seed,
+        rank=rank,
+        max_iter=max_iter,
+        tol=tol,
+        normalize_factors=normalize_factors,
+        l2_reg=l2_reg,
+    )
+    inits = [_restart_init(init, restart) for restart in range(n_restarts)]
+    jobs = min(resolve_jobs(n_jobs), n_restarts)
+    fits = list(ordered_map(fit, enumerate(inits), jobs))
+    return _select_best(fits, inits, seed)
+
+
+def core_consistency(
+    X: np.ndarray, weights: np.ndarray, factors: List[np.ndarray]
+) -> float:
+    # CORCONDIA: how close the least-squares Tucker core for the CP factors is
+    # to a superdiagonal of ones. 100 for a clean trilinear fit; it drops
+    # (and can go negative) once the rank is too high.
+    rank = len(weights)
+    # Gaps are filled with the model's own values.
+    X = np.where(np.isnan(X), tl.cp_to_tensor((weights, factors)), X)
+    scaled = [factors[0] * weights] + list(factors[1:])
+    core = tl.tenalg.multi_mode_dot(X, [np.linalg.pinv(f) for f in scaled])
+    ideal = np.zeros((rank,) * X.ndim)
+    ideal[(np.arange(rank),) * X.ndim] = 1.0
+    return float(100 * (1 - np.sum((core - ideal) ** 2) / rank))
+
+
+def pad_factors(
+    weights: np.ndarray, factors: List[np.ndarray], rank: int, seed: int
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    # Warm start for a higher rank: the given components plus random ones at
+    # the same scale.
+    rng = np.random.default_rng(seed)
+    extra = rank - len(weights)
+    padded = []
+    for f in factors:
+        new = rng.uniform(size=(f.shape[0], extra))
+        new *= np.linalg.norm(f, axis=0).mean() / np.linalg.norm(new, axis=0)
+        padded.append(np.hstack([f, new]))
+    return np.r_[weights, np.full(extra, weights.mean())], padded
+
+
+@dataclass
+class RankSweep:
+    table: pd.DataFrame
+    fits: Dict[int, TCAFit]
+
+
+def rank_sweep(
+    X: np.ndarray,
+    max_rank: int,
+    max_iter: int,
+    tol: float,
+    init: str,
+    normalize_factors: bool,
+    l2_reg: float,
+    n_restarts: int = 1,
+    n_jobs: int = 1,
+    seed: int = 0,
+) -> RankSweep:
+    # Fits ranks 1..max_rank. Restart 0 of rank k + 1 starts from the best
+    # rank-k fit (rank 1 from init). The random restarts of each rank do not
+    # depend on that chain; they are submitted right after the chain fit of
+    # their rank, so they fill idle workers without delaying it. With a
+    # single restart the sweep is a serial chain.
+    fit = partial(
+        _fit_restart,
+        X,
+        seed=seed,
+        max_iter=max_iter,
+        tol=tol,
+        normalize_factors=normalize_factors,
+        l2_reg=l2_reg,
+    )
+    ranks = range(1, max_rank + 1)
+    jobs = min(resolve_jobs(n_jobs), max_rank * n_restarts)
+    fits: Dict[int, TCAFit] = {}
+    with process_pool(jobs) as pool:
+        previous = None
+        for rank in ranks:
+            start: CPInit = init
+            if previous is not None:
+                start = pad_factors(previous.weights, previous.factors, rank, seed)
+            chain = submit(pool, fit, (0, start), rank=rank)
+            random_fits = [
+                submit(pool, fit, (restart, "random"), rank=rank)
+                for restart in range(1, n_restarts)
+            ]
+            restarts = [future.result() for future in random_fits]
+            inits = [init if previous is None else "warm"]
+            inits += ["random"] * len(restarts)
+            previous = fits[rank] = _select_best(
+                [chain.result()] + restarts, inits, seed
+            )
+
+    rows = []
+    for rank, result in fits.items():
+        others = result.restarts.loc[~result.restarts["best"], "similarity"]
+        rows.append(
+            {
+                "rank": rank,
+                "error": result.restarts["error"].min(),
+                "core_consistency": core_consistency(X, result.weights, result.factors),
+                "similarity": others.mean() if len(others) else np.nan,
+            }
+        )
+    return RankSweep(table=pd.DataFrame(rows), fits=fits)
+
+
+def holdout_folds(X: np.ndarray, n_folds: int, seed: int) -> np.ndarray:
+    # Speckled hold-out: every observed entry goes to one of n_folds folds at
+    # random (-1 for missing entries).
+    folds = np.full(X.shape, -1, dtype=np.int64)
+    observed = ~np.isnan(X)
+    n = int(np.count_nonzero(observed))
+    folds[observed] = np.random.default_rng(seed).permutation(n) % n_folds
+    return folds
+
+
+def _fit_fold(
+    tensor: Union[np.ndarray, SharedArrayHandle],
+    task: Tuple[int, int],
+    n_folds: int,
+    seed: int,
+    **fit_kwargs,
+) -> Dict[str, float]:
+    rank, fold = task
+    X = attach_array(tensor) if isinstance(tensor, SharedArrayHandle) else tensor
+    folds = holdout_folds(X, n_folds, seed)
+    train = (folds >= 0) & (folds != fold)
+    test = folds == fold
+    weights, factors = run_tca(
+        X, rank=rank, random_state=seed + fold, mask=train, **fit_kwargs
+    )
+    residual = X - tl.cp_to_tensor((weights, factors))
+
+    def error(entries: np.ndarray) -> float:
+        return float(np.linalg.norm(residual[entries]) / np.linalg.norm(X[entries]))
+
+    return {
+        "rank": rank,
+        "fold": fold,
+        "train_error": error(train),
+        "test_error": error(test),
+    }
+
+
+def cross_validate(
+    X: np.ndarray,
+    ranks: List[int],
+    n_folds: int,
+    max_iter: int,
+    tol: float,
+    init: str,
+    normalize_factors: bool,
+    l2_reg: float,
+    n_jobs: int = 1,
+    seed: int = 0,
+) -> pd.DataFrame:
+    # Fits every (rank, fold) pair on the entries outside the fold and scores
+    # the relative reconstruction error of the held-out fold. Worker processes
+    # attach to one shared copy of X and rebuild the fold assignment from seed.
+    tasks = [(rank, fold) for rank in ranks for fold in range(n_folds)]
+    jobs = min(resolve_jobs(n_jobs), len(tasks))
+    fit_kwargs = dict(
+        n_folds=n_folds,
+        seed=seed,
+        max_iter=max_iter,
+        tol=tol,
+        init=init,
+        normalize_factors=normalize_factors,
+        l2_reg=l2_reg,
+    )
+    if jobs == 1:
+        rows = list(map(partial(_fit_fold, X, **fit_kwargs), tasks))
+    else:
+        with SharedArray(X) as shared:
+            fit = partial(_fit_fold, shared.handle, **fit_kwargs)
+            rows = list(ordered_map(fit, tasks, jobs))
+    return pd.DataFrame(rows)
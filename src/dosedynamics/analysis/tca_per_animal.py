@@ -1,25 +1,63 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from functools import partial
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
+from dosedynamics.analysis.arrest import detect_arrests_batch, still_mask
 from dosedynamics.analysis.features import (
     add_group_id,
     build_feature_names,
     compute_bin_features,
-    compute_stops_lookup,
+    merge_stops,
+    session_bin_frames,
+    stops_per_bin,
+)
+from dosedynamics.analysis.tca import (
+    TCAFit,
+    build_tensor,
+    cross_validate,
+    fill_tensor,
+    rank_sweep,
+    run_tca_restarts,
 )
-from dosedynamics.analysis.tca import build_tensor, fill_tensor, run_tca
 from dosedynamics.config import Config
-from dosedynamics.io.loaders import load_h5
+from dosedynamics.io.dataset import DatasetStore
 from dosedynamics.io.savers import save_dataframe
-from dosedynamics.preprocessing.arena import add_dist_from_wall
 from dosedynamics.preprocessing.bodypart import extract_body_part
+from dosedynamics.preprocessing.frame_features import frame_features
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
 from dosedynamics.utils.paths import PathManager
 
 
+def _session_bin_features(
+    cfg: Config, g_full: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray]:
+    # Sessions arrive already cut to the analysis window.
+    flags = still_mask(
+        g_full,
+        movement_threshold=cfg.arrest.movement_threshold,
+        likelihood_threshold=cfg.preprocessing.likelihood_threshold,
+    )
+    meta_cols = cfg.input.meta_cols
+    features = frame_features(
+        cfg,
+        extract_body_part(g_full, body_part=cfg.input.body_part, meta_cols=meta_cols),
+    )
+    frames, bins = session_bin_frames(
+        SessionTrajectory.from_frame(features, meta_cols),
+        meta_cols=cfg.input.meta_cols,
+        fps=cfg.preprocessing.fps,
+        cutoff_minutes=cfg.preprocessing.cutoff_minutes,
+        bin_seconds=cfg.preprocessing.bin_seconds,
+        min_points=cfg.preprocessing.min_points,
+    )
+    return frames, bins, flags
+
+
 @dataclass
 class TCAResults:
     bin_df: pd.DataFrame
@@ -27,59 +65,87 @@ class TCAResults:
     features: List[str]
     n_bins: int
     meta: List[dict]
+    restarts: pd.DataFrame
+
+
+@dataclass
+class TCACrossValidationResults:
+    folds: pd.DataFrame
+    summary: pd.DataFrame
+
+
+@dataclass
+class TCARankSweepResults:
+    table: pd.DataFrame
+    fits: Dict[int, TCAFit]
+    features: List[str]
+    n_bins: int
+    meta: List[dict]
 
 
 class TCAPerAnimalAnalysis:
-    def __init__(self, cfg: Config, logger) -> None:
+    def __init__(self, cfg: Config, logger, store: DatasetStore | None = None) -> None:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
+        self.store = store or DatasetStore(cfg, logger)
 
-    def prepare_bin_df(self) -> pd.DataFrame:
-        data_full = load_h5(self.paths.resolve(self.cfg.input.h5_path))
+    def bin_cache_config(self) -> Dict[str, Any]:
+        return {
+            "input": self.cfg.input.model_dump(),
+            "preprocessing": self.cfg.preprocessing.model_dump(),
+            "arena": self.cfg.arena.model_dump(),
+            "arrest": self.cfg.arrest.model_dump(),
+            "stop_bin_seconds": self.cfg.analysis.tca.stop_bin_seconds,
+        }
 
-        body_df = extract_body_part(
-            data_full,
-            body_part=self.cfg.input.body_part,
-            meta_cols=self.cfg.input.meta_cols,
-        )
-        body_df = add_dist_from_wall(
-            body_df,
-            self.cfg.arena.width_cm,
-            self.cfg.arena.length_cm,
-        )
+    def cache_config(self) -> Dict[str, Any]:
+        config = self.bin_cache_config()
+        config["tca"] = self.cfg.analysis.tca.model_dump(exclude={"control_group"})
+        return config
 
-        stops_lookup = compute_stops_lookup(
-            data_full,
-            group_cols=self.cfg.input.group_cols,
-            fps=self.cfg.preprocessing.fps,
-            cutoff_minutes=self.cfg.preprocessing.cutoff_minutes,
-            stop_bin_seconds=self.cfg.analysis.tca.stop_bin_seconds,
-            min_still_seconds=self.cfg.arrest.min_still_seconds,
-            movement_threshold=self.cfg.arrest.movement_threshold,
-            likelihood_threshold=self.cfg.preprocessing.likelihood_threshold,
+    def prepare_bin_df(self) -> pd.DataFrame:
+        frames_list = []
+        bins_list = []
+        flags_list = []
+        cutoff_frames = int(
+            self.cfg.preprocessing.cutoff_minutes * 60 * self.cfg.preprocessing.fps
         )
-
-        bin_list = []
-        for _, g in body_df.groupby(self.cfg.input.group_cols):
-            out = compute_bin_features(
-                g,
-                stops_lookup=stops_lookup,
-                group_cols=self.cfg.input.group_cols,
-                meta_cols=self.cfg.input.meta_cols,
-                fps=self.cfg.preprocessing.fps,
-                cutoff_minutes=self.cfg.preprocessing.cutoff_minutes,
-                bin_seconds=self.cfg.preprocessing.bin_seconds,
-                likelihood_threshold=self.cfg.preprocessing.likelihood_threshold,
-                min_points=self.cfg.preprocessing.min_points,
+        for session, (frames, bins, flags) in enumerate(
+            self.store.map(
+                partial(_session_bin_features, self.cfg),
+                full=True,
+                cutoff_frames=cutoff_frames,
             )
-            if len(out) > 0:
-                bin_list.append(out)
+        ):
+            flags_list.append(flags)
+            if len(frames) > 0:
+                frames_list.append(frames.assign(session=session))
+                bins_list.append(bins.assign(session=session))
 
-        if not bin_list:
+        if not frames_list:
             raise ValueError("No bins produced; check input data and config")
 
-        bin_df = pd.concat(bin_list, ignore_index=True)
+        # Stops for every session come from one run-length pass and one
+        # bincount, and are joined to the bin features in a single merge.
+        lengths = np.array([len(f) for f in flags_list], dtype=np.int64)
+        arrests = detect_arrests_batch(
+            np.concatenate(flags_list),
+            np.r_[0, np.cumsum(lengths)],
+            fps=self.cfg.preprocessing.fps,
+            min_still_seconds=self.cfg.arrest.min_still_seconds,
+        )
+        stops = stops_per_bin(
+            arrests["session"],
+            arrests["start_frame"],
+            lengths,
+            int(self.cfg.analysis.tca.stop_bin_seconds * self.cfg.preprocessing.fps),
+        )
+        bin_df = compute_bin_features(
+            pd.concat(frames_list, ignore_index=True),
+            pd.concat(bins_list, ignore_index=True),
+        )
+        bin_df = merge_stops(bin_df, stops, self.cfg.input.meta_cols)
         bin_df = add_group_id(bin_df, self.cfg.input.group_cols, sep="_")
 
         if self.cfg.output.save_processed:
@@ -91,43 +157,164 @@ class TCAPerAnimalAnalysis:
 
         return bin_df
 
-    def run(self) -> TCAResults:
-        bin_df = self.prepare_bin_df()
-
+    def _tensor(
+        self, bin_df: pd.DataFrame
+    ) -> Tuple[np.ndarray, List[dict], List[str], int]:
+        # The unfilled tensor; missing bins are NaN.
         feature_names = build_feature_names(
             base_features=self.cfg.analysis.tca.features.base,
             extra_features=self.cfg.analysis.tca.features.extra,
         )
-
-        X, meta, features, n_bins = build_tensor(
+        return build_tensor(
             bin_df,
             features=feature_names,
             group_id_col="group_id",
             bin_col="bin_id",
         )
+
+    def _log_observed(self, X: np.ndarray) -> None:
+        self.logger.info(
+            "Fitting TCA to %d observed of %d tensor entries",
+            int(np.count_nonzero(~np.isnan(X))),
+            X.size,
+        )
+
+    def prepare_tensor(
+        self, bin_df: pd.DataFrame
+    ) -> Tuple[np.ndarray, List[dict], List[str], int]:
+        X, meta, features, n_bins = self._tensor(bin_df)
         X_filled = fill_tensor(
             X,
             self.cfg.analysis.tca.fill_strategy,
             self.cfg.analysis.tca.fill_value,
         )
-        _, factors = run_tca(
+        if self.cfg.analysis.tca.fill_strategy == "mask":
+            self._log_observed(X_filled)
+        return X_filled, meta, features, n_bins
+
+    def run(self, bin_df: pd.DataFrame | None = None) -> TCAResults:
+        if bin_df is None:
+            bin_df = self.prepare_bin_df()
+
+        X_filled, meta, features, n_bins = self.prepare_tensor(bin_df)
+        tca_cfg = self.cfg.analysis.tca
+        fit = run_tca_restarts(
             X_filled,
-            rank=self.cfg.analysis.tca.rank,
-            max_iter=self.cfg.analysis.tca.max_iter,
-            tol=self.cfg.analysis.tca.tol,
-            init=self.cfg.analysis.tca.init,
-            normalize_factors=self.cfg.analysis.tca.normalize_factors,
-            l2_reg=self.cfg.analysis.tca.l2_reg,
+            rank=tca_cfg.rank,
+            max_iter=tca_cfg.max_iter,
+            tol=tca_cfg.tol,
+            init=tca_cfg.init,
+            normalize_factors=tca_cfg.normalize_factors,
+            l2_reg=tca_cfg.l2_reg,
+            n_restarts=tca_cfg.n_restarts,
+            n_jobs=tca_cfg.n_jobs,
+            seed=tca_cfg.seed,
+        )
+        if tca_cfg.n_restarts > 1:
+            for row in fit.restarts.itertuples():
+                self.logger.info(
+                    "TCA restart %d (%s): error %.4f, similarity to best %.3f%s",
+                    row.restart,
+                    row.init,
+                    row.error,
+                    row.similarity,
+                    " [best]" if row.best else "",
+                )
+        # With fill_strategy "mask" the error covers the observed entries only.
+        self.logger.info(
+            "TCA rank %d fit: relative error %.4f over %d fitted entries",
+            tca_cfg.rank,
+            fit.restarts.loc[fit.restarts["best"], "error"].iloc[0],
+            int(np.count_nonzero(~np.isnan(X_filled))),
         )
 
         return TCAResults(
             bin_df=bin_df,
-            factors=factors,
+            factors=fit.factors,
+            features=features,
+            n_bins=n_bins,
+            meta=meta,
+            restarts=fit.restarts,
+        )
+
+    def rank_sweep(self, bin_df: pd.DataFrame | None = None) -> TCARankSweepResults:
+        if bin_df is None:
+            bin_df = self.prepare_bin_df()
+
+        X_filled, meta, features, n_bins = self.prepare_tensor(bin_df)
+        tca_cfg = self.cfg.analysis.tca
+        if tca_cfg.n_restarts == 1 and tca_cfg.n_jobs != 1:
+            self.logger.info(
+                "Rank sweep with n_restarts=1 is a serial warm-start chain; "
+                "n_jobs has no effect"
+            )
+        sweep = rank_sweep(
+            X_filled,
+            max_rank=tca_cfg.sweep_max_rank,
+            max_iter=tca_cfg.max_iter,
+            tol=tca_cfg.tol,
+            init=tca_cfg.init,
+            normalize_factors=tca_cfg.normalize_factors,
+            l2_reg=tca_cfg.l2_reg,
+            n_restarts=tca_cfg.n_restarts,
+            n_jobs=tca_cfg.n_jobs,
+            seed=tca_cfg.seed,
+        )
+        for row in sweep.table.itertuples():
+            self.logger.info(
+                "TCA rank %d: error %.4f, core consistency %.1f, similarity %.3f",
+                row.rank,
+                row.error,
+                row.core_consistency,
+                row.similarity,
+            )
+        return TCARankSweepResults(
+            table=sweep.table,
+            fits=sweep.fits,
             features=features,
             n_bins=n_bins,
             meta=meta,
         )
 
+    def cross_validate(
+        self, bin_df: pd.DataFrame | None = None
+    ) -> TCACrossValidationResults:
+        if bin_df is None:
+            bin_df = self.prepare_bin_df()
+
+        # Folds are drawn from the observed entries only, whatever
+        # fill_strategy is: filled values are neither held out nor fitted.
+        X, *_ = self._tensor(bin_df)
+        self._log_observed(X)
+        tca_cfg = self.cfg.analysis.tca
+        folds = cross_validate(
+            X,
+            ranks=list(range(1, tca_cfg.sweep_max_rank + 1)),
+            n_folds=tca_cfg.cv_folds,
+            max_iter=tca_cfg.max_iter,
+            tol=tca_cfg.tol,
+            init=tca_cfg.init,
+            normalize_factors=tca_cfg.normalize_factors,
+            l2_reg=tca_cfg.l2_reg,
+            n_jobs=tca_cfg.n_jobs,
+            seed=tca_cfg.seed,
+        )
+        summary = (
+            folds.groupby("rank")[["train_error", "test_error"]]
+            .agg(["mean", "std"])
+            .pipe(lambda df: df.set_axis(["_".join(c) for c in df.columns], axis=1))
+            .reset_index()
+        )
+        for row in summary.itertuples():
+            self.logger.info(
+                "TCA rank %d: train error %.4f, held-out error %.4f +/- %.4f",
+                row.rank,
+                row.train_error_mean,
+                row.test_error_mean,
+                row.test_error_std,
+            )
+        return TCACrossValidationResults(folds=folds, summary=summary)
+
     @staticmethod
     def build_loading_df(factors, meta: list[dict]) -> pd.DataFrame:
         mouse_f = factors[0]
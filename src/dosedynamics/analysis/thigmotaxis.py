@@ -1,17 +1,35 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, List
 
 import numpy as np
 import pandas as pd
 
 from dosedynamics.analysis.stats import perform_tests
 from dosedynamics.config import Config
-from dosedynamics.io.loaders import load_h5
-from dosedynamics.preprocessing.bodypart import extract_body_part
+from dosedynamics.io.dataset import DatasetStore
+from dosedynamics.preprocessing.frame_features import first_valid
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
 from dosedynamics.utils.paths import PathManager
 
 
+def _session_index(cfg: Config, session: SessionTrajectory) -> pd.DataFrame:
+    cutoff_frames = int(cfg.preprocessing.cutoff_minutes * 60 * cfg.preprocessing.fps)
+    g = first_valid(session, cutoff_frames)
+    if len(g) == 0:
+        return pd.DataFrame()
+    out = pd.DataFrame({col: [session.meta[col]] for col in cfg.input.group_cols})
+    out["thigmo_frames"] = np.int64(g["in_border"].sum())
+    out["total_frames"] = np.int64(len(g))
+    out["thigmotaxis_index"] = out["thigmo_frames"] / out["total_frames"]
+    for col in cfg.input.meta_cols:
+        if col not in out.columns:
+            out[col] = session.meta[col]
+    return out
+
+
 @dataclass
 class ThigmotaxisResults:
     per_group: pd.DataFrame
@@ -19,38 +37,21 @@ class ThigmotaxisResults:
 
 
 class ThigmotaxisAnalysis:
-    def __init__(self, cfg: Config, logger) -> None:
+    def __init__(self, cfg: Config, logger, store: DatasetStore | None = None) -> None:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
-
-    def _add_thigmotaxis_flag(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        width = self.cfg.arena.width_cm
-        length = self.cfg.arena.length_cm
-        margin_frac = self.cfg.analysis.thigmotaxis.margin_frac
-
-        dist_left = df["x"]
-        dist_right = width - df["x"]
-        dist_bottom = df["y"]
-        dist_top = length - df["y"]
-
-        df["dist_from_wall"] = np.minimum.reduce(
-            [dist_left, dist_right, dist_top, dist_bottom]
-        )
-
-        border_thickness = margin_frac * min(width, length)
-        df["is_thigmo"] = df["dist_from_wall"] <= border_thickness
-        return df
-
-    def _compute_index(self, df: pd.DataFrame) -> pd.DataFrame:
-        out = (
-            df.groupby(self.cfg.input.group_cols)["is_thigmo"]
-            .agg(thigmo_frames="sum", total_frames="count")
-            .reset_index()
-        )
-        out["thigmotaxis_index"] = out["thigmo_frames"] / out["total_frames"]
-        return out
+        self.store = store or DatasetStore(cfg, logger)
+
+    def cache_config(self) -> Dict[str, Any]:
+        return {
+            "input": self.cfg.input.model_dump(),
+            "preprocessing": self.cfg.preprocessing.model_dump(),
+            "arena": self.cfg.arena.model_dump(),
+            "thigmotaxis": self.cfg.analysis.thigmotaxis.model_dump(
+                include={"control_group", "margin_frac", "metric", "area_normalize"}
+            ),
+        }
 
     def _area_normalize(self, df: pd.DataFrame) -> pd.DataFrame:
         width = self.cfg.arena.width_cm
@@ -69,32 +70,18 @@ class ThigmotaxisAnalysis:
         return df
 
     def run(self) -> ThigmotaxisResults:
-        data_full = load_h5(self.paths.resolve(self.cfg.input.h5_path))
-        body_df = extract_body_part(
-            data_full,
-            body_part=self.cfg.input.body_part,
-            meta_cols=self.cfg.input.meta_cols,
-        )
-
-        cutoff_frames = int(
-            self.cfg.preprocessing.cutoff_minutes * 60 * self.cfg.preprocessing.fps
-        )
-        df_time = (
-            body_df[
-                body_df["likelihood"] >= self.cfg.preprocessing.likelihood_threshold
-            ]
-            .groupby(self.cfg.input.group_cols, group_keys=False)
-            .apply(lambda g: g.head(cutoff_frames))
-        )
-
-        df_thig = self._add_thigmotaxis_flag(df_time)
-        thig_df = self._compute_index(df_thig)
-
-        for col in self.cfg.input.meta_cols:
-            if col not in thig_df.columns and col in body_df.columns:
-                thig_df[col] = (
-                    body_df.groupby(self.cfg.input.group_cols)[col].first().values
-                )
+        index_list: List[pd.DataFrame] = [
+            out
+            for out in self.store.map(partial(_session_index, self.cfg), features=True)
+            if not out.empty
+        ]
+
+        if not index_list:
+            raise ValueError(
+                "No thigmotaxis indices computed; check input data and config"
+            )
+
+        thig_df = pd.concat(index_list, ignore_index=True)
 
         if self.cfg.analysis.thigmotaxis.area_normalize:
             thig_df = self._area_normalize(thig_df)
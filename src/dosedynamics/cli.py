@@ -1,4 +1,5 @@
 import argparse
+import json
 from typing import List
 
 from dosedynamics.config import load_config
@@ -19,7 +20,22 @@ def _parse_args(argv: List[str] | None) -> argparse.Namespace:
             help="Config overrides as key=value",
         )
 
-    add_common(sub.add_parser("run", help="Run full pipeline"))
+    def add_jobs(p: argparse.ArgumentParser, help_text: str) -> None:
+        p.add_argument("--jobs", type=int, help=f"{help_text} (0 = all cores)")
+
+    def add_analysis(name: str, help_text: str) -> None:
+        p = sub.add_parser(name, help=help_text)
+        add_common(p)
+        p.add_argument(
+            "--where",
+            action="append",
+            default=[],
+            help="Filter on a metadata column, e.g. 'concentration in C,H' "
+            "or 'date>=20240101' (repeatable)",
+        )
+        add_jobs(p, "Number of worker processes for per-session work")
+
+    add_analysis("run", "Run full pipeline")
 
     arena_parser = sub.add_parser("arena-points", help="Annotate arena corners")
     add_common(arena_parser)
@@ -27,17 +43,21 @@ def _parse_args(argv: List[str] | None) -> argparse.Namespace:
     arena_parser.add_argument("--time", help="Timestamp (seconds or HH:MM:SS(.ms))")
     arena_parser.add_argument("--output", help="Output HDF5 path")
 
-    add_common(sub.add_parser("assemble", help="Assemble combined DLC dataset"))
-    add_common(sub.add_parser("preprocess", help="Run preprocessing only"))
-    add_common(sub.add_parser("analyze", help="Run analysis only"))
-    add_common(sub.add_parser("plot", help="Run plotting only"))
-    add_common(sub.add_parser("tca", help="Run TCA analysis + plots"))
-    add_common(sub.add_parser("speed-bins", help="Run speed bin analysis"))
-    add_common(sub.add_parser("speed-distance", help="Run speed and distance analysis"))
-    add_common(sub.add_parser("thigmotaxis", help="Run thigmotaxis analysis"))
-    add_common(sub.add_parser("dispersion", help="Run dispersion analysis"))
-    add_common(sub.add_parser("arrests", help="Run arrest detection analysis"))
-    add_common(sub.add_parser("center-crossings", help="Run center crossings analysis"))
+    assemble_parser = sub.add_parser("assemble", help="Assemble combined DLC dataset")
+    add_common(assemble_parser)
+    add_jobs(assemble_parser, "Number of worker processes reading DLC files")
+    add_analysis("preprocess", "Run preprocessing only")
+    add_analysis("analyze", "Run analysis only")
+    add_analysis("plot", "Run plotting only")
+    add_analysis("tca", "Run TCA analysis + plots")
+    add_analysis("tca-ranks", "Sweep TCA ranks and plot model-selection diagnostics")
+    add_analysis("tca-cv", "Cross-validate TCA ranks on held-out tensor entries")
+    add_analysis("speed-bins", "Run speed bin analysis")
+    add_analysis("speed-distance", "Run speed and distance analysis")
+    add_analysis("thigmotaxis", "Run thigmotaxis analysis")
+    add_analysis("dispersion", "Run dispersion analysis")
+    add_analysis("arrests", "Run arrest detection analysis")
+    add_analysis("center-crossings", "Run center crossings analysis")
 
     return parser.parse_args(args=argv)
 
@@ -53,10 +73,21 @@ def _arena_overrides(args: argparse.Namespace) -> List[str]:
     return overrides
 
 
+def _analysis_overrides(args: argparse.Namespace) -> List[str]:
+    overrides = list(args.overrides)
+    if getattr(args, "where", None):
+        overrides.append(f"input.filters={json.dumps(args.where)}")
+    if getattr(args, "jobs", None) is not None:
+        overrides.append(f"parallel.jobs={args.jobs}")
+    return overrides
+
+
 def main(argv: List[str] | None = None) -> None:
     args = _parse_args(argv)
     overrides = (
-        _arena_overrides(args) if args.command == "arena-points" else args.overrides
+        _arena_overrides(args)
+        if args.command == "arena-points"
+        else _analysis_overrides(args)
     )
     cfg = load_config(args.config, overrides)
     logger = setup_logging(cfg)
@@ -77,6 +108,10 @@ def main(argv: List[str] | None = None) -> None:
         pipeline.run_plot()
     elif args.command == "tca":
         pipeline.run_tca()
+    elif args.command == "tca-ranks":
+        pipeline.run_tca_ranks()
+    elif args.command == "tca-cv":
+        pipeline.run_tca_cv()
     elif args.command == "speed-bins":
         pipeline.run_speed_bins()
     elif args.command == "speed-distance":
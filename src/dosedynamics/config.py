@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict, List
 
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ProjectConfig(BaseModel):
@@ -30,6 +30,8 @@ class InputConfig(BaseModel):
     body_part: str
     meta_cols: List[str]
     group_cols: List[str]
+    filters: List[str] = []
+    streaming: bool = False
 
 
 class PreprocessingConfig(BaseModel):
@@ -67,6 +69,13 @@ class TCAConfig(BaseModel):
     fill_strategy: str
     fill_value: float
     l2_reg: float
+    n_restarts: int = 1
+    n_jobs: int = 1
+    seed: int = 0
+    sweep_max_rank: int = 6
+    sweep_table_filename: str = "tca_rank_sweep.csv"
+    cv_folds: int = 10
+    cv_table_filename: str = "tca_cv.csv"
 
 
 class SpeedBinsHistogramConfig(BaseModel):
@@ -225,10 +234,19 @@ class PlotStyleConfig(BaseModel):
     show_fliers: bool
 
 
+class PlotRankSweepConfig(BaseModel):
+    fig_size: List[float] = [12, 3.5]
+    title_error: str = "Reconstruction error"
+    title_consistency: str = "Core consistency"
+    title_similarity: str = "Restart similarity"
+    xlabel_rank: str = "Rank"
+
+
 class PlotSaveConfig(BaseModel):
     enabled: bool
     factors_filename: str
     loadings_filename: str
+    rank_sweep_filename: str = "tca_rank_sweep.png"
 
 
 class PlottingConfig(BaseModel):
@@ -238,6 +256,7 @@ class PlottingConfig(BaseModel):
     color_map: Dict[str, str]
     factors: PlotFactorsConfig
     loadings: PlotLoadingsConfig
+    rank_sweep: PlotRankSweepConfig = PlotRankSweepConfig()
     jitter: PlotJitterConfig
     style: PlotStyleConfig
     save: PlotSaveConfig
@@ -273,6 +292,10 @@ class DatasetBuildConfig(BaseModel):
     output_mode: str
     output_format: str
     append: bool
+    storage: str = "hdf5"
+    output_dir: str = "data/interim/combined_data"
+    incremental: bool = True
+    csv_block_size: int = 16777216
     video_name: VideoNameConfig
     metadata_fields: List[MetadataFieldConfig]
     administration: AdministrationConfig
@@ -294,6 +317,19 @@ class OutputConfig(BaseModel):
     processed_filename: str
 
 
+class CacheConfig(BaseModel):
+    enabled: bool = True
+    dir_name: str = "cache"
+    hash_content: bool = False
+    max_size_mb: float = 2048
+    max_age_days: float = 30
+
+
+class ParallelConfig(BaseModel):
+    jobs: int = 1
+    shared_memory: bool = True
+
+
 class Config(BaseModel):
     project: ProjectConfig
     paths: PathsConfig
@@ -307,6 +343,8 @@ class Config(BaseModel):
     dataset_build: DatasetBuildConfig
     arena_points: ArenaPointsConfig
     output: OutputConfig
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    parallel: ParallelConfig = Field(default_factory=ParallelConfig)
 
 
 def _set_nested(data: Dict[str, Any], keys: List[str], value: Any) -> None:
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from dosedynamics import __version__
+from dosedynamics.config import Config
+from dosedynamics.utils.paths import PathManager
+
+_MISSING = object()
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_identity(path: Path, hash_content: bool) -> Dict[str, Any]:
+    stat = path.stat()
+    identity: Dict[str, Any] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if hash_content:
+        identity["sha256"] = _sha256(path)
+    return identity
+
+
+def _dataset_files(root: Path) -> List[Path]:
+    # Data files of a partitioned store; like pyarrow, skip anything whose
+    # path has a part starting with "_" or "." (e.g. the assemble manifest).
+    return sorted(
+        p
+        for p in root.rglob("*")
+        if p.is_file()
+        and not any(part.startswith(("_", ".")) for part in p.relative_to(root).parts)
+    )
+
+
+def file_identity(path: Path, hash_content: bool) -> Dict[str, Any]:
+    if path.is_dir():
+        # A partitioned store: the directory's own stat does not change when
+        # a partition file is rewritten, so identify it by its files.
+        files = [
+            {"path": p.relative_to(path).as_posix(), **_stat_identity(p, hash_content)}
+            for p in _dataset_files(path)
+        ]
+        return {"path": str(path.resolve()), "files": files}
+    return {"path": str(path.resolve()), **_stat_identity(path, hash_content)}
+
+
+class ArtifactCache:
+    def __init__(self, cfg: Config, logger) -> None:
+        self.cfg = cfg
+        self.logger = logger
+        self.paths = PathManager(cfg)
+        self.cache_dir = self.paths.cache_dir()
+        self._identity: Dict[str, Any] | None = None
+
+    def _input_identity(self) -> Dict[str, Any]:
+        if self._identity is None:
+            self._identity = file_identity(
+                self.paths.resolve(self.cfg.input.h5_path),
+                self.cfg.cache.hash_content,
+            )
+        return self._identity
+
+    def key(self, stage: str, config: Dict[str, Any]) -> str:
+        payload = {
+            "stage": stage,
+            "version": __version__,
+            "input": self._input_identity(),
+            "config": config,
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / f"{stage}-{key[:32]}.pkl"
+
+    def get(self, stage: str, config: Dict[str, Any]) -> Any:
+        path = self._entry_path(stage, self.key(stage, config))
+        if not path.exists():
+            return _MISSING
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as exc:
+            self.logger.warning("Ignoring unreadable cache entry %s: %s", path, exc)
+            return _MISSING
+        os.utime(path)
+        return value
+
+    def put(self, stage: str, config: Dict[str, Any], value: Any) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(stage, self.key(stage, config))
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_compute(
+        self, stage: str, config: Dict[str, Any], compute: Callable[[], Any]
+    ) -> Any:
+        if not self.cfg.cache.enabled:
+            return compute()
+
+        start = time.perf_counter()
+        value = self.get(stage, config)
+        if value is not _MISSING:
+            self.logger.info(
+                "Loaded %s from cache in %.1f ms",
+                stage,
+                (time.perf_counter() - start) * 1000,
+            )
+            return value
+
+        value = compute()
+        self.put(stage, config, value)
+        self.logger.debug("Stored %s in cache %s", stage, self.cache_dir)
+        return value
+
+    def evict(self) -> List[Path]:
+        if not self.cache_dir.exists():
+            return []
+
+        entries = [(p, p.stat()) for p in self.cache_dir.glob("*.pkl")]
+        max_age_s = self.cfg.cache.max_age_days * 24 * 3600
+        max_bytes = self.cfg.cache.max_size_mb * 1024 * 1024
+        now = time.time()
+
+        removed: List[Path] = []
+        kept = []
+        for p, stat in sorted(entries, key=lambda e: e[1].st_mtime, reverse=True):
+            if now - stat.st_mtime > max_age_s:
+                removed.append(p)
+            else:
+                kept.append((p, stat))
+
+        total = sum(stat.st_size for _, stat in kept)
+        while kept and total > max_bytes:
+            p, stat = kept.pop()
+            total -= stat.st_size
+            removed.append(p)
+
+        for p in removed:
+            p.unlink(missing_ok=True)
+        if removed:
+            self.logger.info(
+                "Evicted %d cache entries from %s", len(removed), self.cache_dir
+            )
+        return removed
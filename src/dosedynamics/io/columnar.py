@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+# Pose columns are stored flat as "scorer|bodyparts|coords"; metadata columns
+# keep their first-level name.
+POSE_SEP = "|"
+DLC_LEVELS = ["scorer", "bodyparts", "coords"]
+
+
+def is_pose_column(col: Hashable) -> bool:
+    return isinstance(col, tuple) and len(col) == 3 and col[2] != ""
+
+
+def flatten_column(col: Hashable) -> str:
+    if is_pose_column(col):
+        return POSE_SEP.join(str(level) for level in col)
+    return str(col[0] if isinstance(col, tuple) else col)
+
+
+def split_column(name: str) -> Tuple[str, str, str]:
+    parts = name.split(POSE_SEP)
+    if len(parts) == 3:
+        return parts[0], parts[1], parts[2]
+    return name, "", ""
+
+
+def restore_columns(names: List[str]) -> pd.MultiIndex:
+    return pd.MultiIndex.from_tuples(
+        [split_column(name) for name in names], names=DLC_LEVELS
+    )
+
+
+def select_columns(
+    columns: List[Tuple[str, str, str]],
+    body_parts: Optional[List[str]] = None,
+    coords: Optional[List[str]] = None,
+    meta_cols: Optional[List[str]] = None,
+) -> List[Tuple[str, str, str]]:
+    selected = []
+    for col in columns:
+        if is_pose_column(col):
+            if body_parts is not None and col[1] not in body_parts:
+                continue
+            if coords is not None and col[2] not in coords:
+                continue
+        elif meta_cols is not None and col[0] not in meta_cols:
+            continue
+        selected.append(col)
+    return selected
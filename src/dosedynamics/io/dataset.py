@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
+import pandas as pd
+
+from dosedynamics.config import Config
+from dosedynamics.io.filters import parse_filters
+from dosedynamics.io.loaders import iter_sessions, load_dataset
+from dosedynamics.io.session_index import SessionIndex, build_session_index
+from dosedynamics.io.shared import (
+    SharedTrajectoryStore,
+    call_on_session,
+    call_on_trajectory,
+)
+from dosedynamics.preprocessing.bodypart import extract_body_part
+from dosedynamics.preprocessing.frame_features import frame_features
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
+from dosedynamics.utils.parallel import ordered_map, resolve_jobs
+from dosedynamics.utils.paths import PathManager
+
+R = TypeVar("R")
+
+
+# Frames returned by the store are shared between analyses: treat them as
+# read-only and copy before mutating.
+class DatasetStore:
+    def __init__(self, cfg: Config, logger) -> None:
+        self.cfg = cfg
+        self.logger = logger
+        self.paths = PathManager(cfg)
+        self.loads = 0
+        self.reuses = 0
+        self.streams = 0
+        self._path: Path | None = None
+        self._full: pd.DataFrame | None = None
+        self._body: pd.DataFrame | None = None
+        self._features: pd.DataFrame | None = None
+        self._index: SessionIndex | None = None
+
+    def _input_path(self) -> Path:
+        return self.paths.resolve(self.cfg.input.h5_path)
+
+    def full(self) -> pd.DataFrame:
+        path = self._input_path()
+        if self._path != path:
+            self.clear()
+        if self._full is not None:
+            self.reuses += 1
+            self.logger.debug("Reusing loaded dataset %s", path)
+            return self._full
+
+        self.logger.info("Loading dataset %s", path)
+        self._full = load_dataset(
+            path,
+            self.cfg.input.group_cols,
+            filters=parse_filters(self.cfg.input.filters),
+        )
+        self._path = path
+        self.loads += 1
+        return self._full
+
+    def body(self) -> pd.DataFrame:
+        path = self._input_path()
+        if self._body is not None and self._path == path:
+            self.reuses += 1
+            return self._body
+
+        if self._full is None:
+            self.logger.info(
+                "Loading %s columns from %s", self.cfg.input.body_part, path
+            )
+            data = load_dataset(
+                path,
+                self.cfg.input.group_cols,
+                body_parts=[self.cfg.input.body_part],
+                meta_cols=self.cfg.input.meta_cols,
+                filters=parse_filters(self.cfg.input.filters),
+            )
+            self._path = path
+            self._index = None
+            self._features = None
+            self.loads += 1
+        else:
+            data = self.full()
+
+        self._body = extract_body_part(
+            data,
+            body_part=self.cfg.input.body_part,
+            meta_cols=self.cfg.input.meta_cols,
+        )
+        return self._body
+
+    def features(self) -> pd.DataFrame:
+        # Per-frame features of the body part, computed in one pass and shared
+        # by every analysis of the run.
+        path = self._input_path()
+        if self._features is not None and self._path == path:
+            self.reuses += 1
+            return self._features
+
+        body = self.body()
+        self._features = frame_features(self.cfg, body, self.session_index())
+        return self._features
+
+    def session_index(self) -> SessionIndex:
+        # Built once per loaded dataset; full() and body() share their rows.
+        if self._index is None:
+            data = self._full if self._full is not None else self.body()
+            self._index = build_session_index(data, self.cfg.input.group_cols)
+        return self._index
+
+    def _data(
+        self, full: bool, features: bool, cutoff_frames: Optional[int]
+    ) -> pd.DataFrame:
+        if full:
+            data = self.full()
+        else:
+            data = self.features() if features else self.body()
+        if cutoff_frames is not None:
+            keep = self.session_index().window(stop=cutoff_frames)
+            if not keep.all():
+                data = data[keep]
+        return data
+
+    def sessions(
+        self,
+        full: bool = False,
+        by: Optional[List[str]] = None,
+        sort: bool = True,
+        features: bool = False,
+        cutoff_frames: Optional[int] = None,
+    ) -> Iterator[pd.DataFrame | SessionTrajectory]:
+        # cutoff_frames keeps only the first frames of every session; with
+        # features=True sessions come as SessionTrajectory objects.
+        by = by or self.cfg.input.group_cols
+        meta_cols = self.cfg.input.meta_cols
+        if not self.cfg.input.streaming:
+            data = self._data(full, features, cutoff_frames)
+            for _, g in data.groupby(by, sort=sort):
+                yield SessionTrajectory.from_frame(g, meta_cols) if features else g
+            return
+
+        # Streaming: read one session at a time so peak memory is bounded by
+        # the largest session rather than the whole dataset.
+        path = self._input_path()
+        self.logger.info("Streaming sessions from %s", path)
+        self.streams += 1
+        for session in iter_sessions(
+            path,
+            self.cfg.input.group_cols,
+            body_parts=None if full else [self.cfg.input.body_part],
+            meta_cols=None if full else self.cfg.input.meta_cols,
+            filters=parse_filters(self.cfg.input.filters),
+            sort=sort,
+        ):
+            if cutoff_frames is not None:
+                index = build_session_index(session, self.cfg.input.group_cols)
+                session = session[index.window(stop=cutoff_frames)]
+            if not full:
+                session = extract_body_part(
+                    session,
+                    body_part=self.cfg.input.body_part,
+                    meta_cols=self.cfg.input.meta_cols,
+                )
+                if features:
+                    session = frame_features(self.cfg, session)
+            for _, g in session.groupby(by, sort=sort):
+                yield SessionTrajectory.from_frame(g, meta_cols) if features else g
+
+    def map(
+        self,
+        func: Callable[[Any], R],
+        full: bool = False,
+        by: Optional[List[str]] = None,
+        sort: bool = True,
+        features: bool = False,
+        cutoff_frames: Optional[int] = None,
+    ) -> Iterator[R]:
+        sessions = partial(
+            self.sessions,
+            full=full,
+            by=by,
+            sort=sort,
+            features=features,
+            cutoff_frames=cutoff_frames,
+        )
+        jobs = resolve_jobs(self.cfg.parallel.jobs)
+        if jobs == 1:
+            yield from map(func, sessions())
+            return
+
+        self.logger.info("Processing sessions with %d workers", jobs)
+        if self.cfg.input.streaming or not self.cfg.parallel.shared_memory:
+            yield from ordered_map(func, sessions(), jobs)
+            return
+
+        # Workers attach to one shared copy of the trajectories instead of
+        # receiving a pickled frame per session.
+        data = self._data(full, features, cutoff_frames)
+        with SharedTrajectoryStore(data, by or self.cfg.input.group_cols, sort) as shm:
+            if features:
+                call = partial(
+                    call_on_trajectory, func, shm.handle, self.cfg.input.meta_cols
+                )
+            else:
+                call = partial(call_on_session, func, shm.handle)
+            yield from ordered_map(call, shm.tasks(), jobs)
+
+    def clear(self) -> None:
+        self._path = None
+        self._full = None
+        self._body = None
+        self._features = None
+        self._index = None
+
+    def log_summary(self) -> None:
+        self.logger.info(
+            "Dataset store: %d load(s), %d saved by reuse, %d streamed pass(es)",
+            self.loads,
+            self.reuses,
+            self.streams,
+        )
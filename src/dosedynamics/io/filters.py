@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import operator
+import re
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+_FILTER_RE = re.compile(
+    r"^\s*(?P<column>\w+)\s*(?P<op>not in|in|==|!=|>=|<=|=|>|<)\s*(?P<value>.+?)\s*$"
+)
+
+_COMPARE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+@dataclass(frozen=True)
+class MetaFilter:
+    column: str
+    op: str
+    values: tuple
+
+
+def parse_filter(text: str) -> MetaFilter:
+    match = _FILTER_RE.match(text)
+    if not match:
+        raise ValueError(
+            f"Invalid filter '{text}', expected e.g. 'concentration in C,H' "
+            "or 'date>=20240101'"
+        )
+    op = "==" if match.group("op") == "=" else match.group("op")
+    raw = match.group("value").strip("[]()")
+    values = tuple(v.strip().strip("'\"") for v in raw.split(","))
+    if op not in ("in", "not in") and len(values) != 1:
+        raise ValueError(f"Operator '{op}' takes a single value in '{text}'")
+    return MetaFilter(column=match.group("column"), op=op, values=values)
+
+
+def parse_filters(texts: List[str]) -> List[MetaFilter]:
+    return [parse_filter(t) for t in texts]
+
+
+def filter_mask(df: pd.DataFrame, filters: List[MetaFilter]) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for f in filters:
+        col = df[f.column]
+        if isinstance(col, pd.DataFrame):
+            col = col.iloc[:, 0]
+        col = col.astype(str)
+        if f.op == "in":
+            term = col.isin(f.values)
+        elif f.op == "not in":
+            term = ~col.isin(f.values)
+        else:
+            term = _COMPARE[f.op](col, f.values[0])
+        mask &= term.to_numpy()
+    return mask
+
+
+def to_arrow_expression(filters: List[MetaFilter]):
+    expr = None
+    for f in filters:
+        field = ds.field(f.column)
+        if f.op == "in":
+            term = field.isin(list(f.values))
+        elif f.op == "not in":
+            term = ~field.isin(list(f.values))
+        else:
+            term = _COMPARE[f.op](field, f.values[0])
+        expr = term if expr is None else expr & term
+    return expr
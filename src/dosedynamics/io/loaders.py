@@ -1,7 +1,320 @@
+import csv
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
 
+from dosedynamics.io.columnar import (
+    flatten_column,
+    is_pose_column,
+    restore_columns,
+    select_columns,
+    split_column,
+)
+from dosedynamics.io.filters import MetaFilter, filter_mask, to_arrow_expression
 
-def load_h5(path: Path) -> pd.DataFrame:
+H5_CHUNK_ROWS = 1_000_000
+CSV_BLOCK_BYTES = 16 << 20
+DLC_HEADER_LEVELS = ["scorer", "bodyparts", "coords"]
+
+
+def _with_filter_columns(
+    meta_cols: Optional[List[str]], filters: List[MetaFilter]
+) -> Optional[List[str]]:
+    if meta_cols is None:
+        return None
+    return list(meta_cols) + [f.column for f in filters if f.column not in meta_cols]
+
+
+def _drop_filter_columns(
+    df: pd.DataFrame, meta_cols: Optional[List[str]], filters: List[MetaFilter]
+) -> pd.DataFrame:
+    if meta_cols is None:
+        return df
+    extra = [f.column for f in filters if f.column not in meta_cols]
+    return df.drop(columns=extra, level=0) if extra else df
+
+
+def load_h5(
+    path: Path,
+    body_parts: Optional[List[str]] = None,
+    coords: Optional[List[str]] = None,
+    meta_cols: Optional[List[str]] = None,
+    filters: Optional[List[MetaFilter]] = None,
+) -> pd.DataFrame:
+    filters = filters or []
+    if body_parts is None and coords is None and meta_cols is None and not filters:
+        return pd.read_hdf(path)
+
+    read_meta = _with_filter_columns(meta_cols, filters)
+    with pd.HDFStore(path, mode="r") as store:
+        keys = store.keys()
+        if len(keys) != 1:
+            raise ValueError(f"Expected a single dataset key in {path}, found {keys}")
+        storer = store.get_storer(keys[0])
+
+        if storer.is_table:
+            # Table format: only the projected columns are materialized, and
+            # rows are filtered chunk by chunk.
+            all_columns = list(storer.non_index_axes[0][1])
+            columns = select_columns(all_columns, body_parts, coords, read_meta)
+            chunks = [
+                chunk[filter_mask(chunk, filters)]
+                for chunk in store.select(
+                    keys[0], columns=columns, chunksize=H5_CHUNK_ROWS
+                )
+            ]
+            df = pd.concat(chunks) if chunks else store.select(keys[0], stop=0)
+            df = df[columns]
+        else:
+            df = store.select(keys[0])
+            df = df[select_columns(list(df.columns), body_parts, coords, read_meta)]
+            df = df[filter_mask(df, filters)]
+
+    return _drop_filter_columns(df, meta_cols, filters)
+
+
+def _dlc_csv_header(path: Path) -> pd.MultiIndex:
+    # DLC CSVs start with one row per column level, each led by the level name.
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        rows = [next(reader, []) for _ in DLC_HEADER_LEVELS]
+    names = [row[0] if row else "" for row in rows]
+    if names != DLC_HEADER_LEVELS or len({len(row) for row in rows}) != 1:
+        raise ValueError(
+            f"{path} does not have a DLC {'/'.join(DLC_HEADER_LEVELS)} header"
+        )
+    return pd.MultiIndex.from_arrays([row[1:] for row in rows], names=names)
+
+
+def iter_dlc_csv(
+    path: Path, block_size: int = CSV_BLOCK_BYTES, dtype: np.dtype = np.float32
+) -> Iterator[pd.DataFrame]:
+    # Streams a DLC CSV in blocks of about block_size bytes, parsed by
+    # pyarrow's multi-threaded reader; the frame number becomes the index.
+    columns = _dlc_csv_header(path)
+    names = ["frame"] + [f"c{i}" for i in range(len(columns))]
+    value_type = pa.from_numpy_dtype(np.dtype(dtype))
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(
+            skip_rows=len(DLC_HEADER_LEVELS), column_names=names, block_size=block_size
+        ),
+        convert_options=pacsv.ConvertOptions(
+            column_types={"frame": pa.int64(), **dict.fromkeys(names[1:], value_type)}
+        ),
+    )
+    for batch in reader:
+        values = np.empty((batch.num_rows, len(columns)), dtype=dtype)
+        for i in range(len(columns)):
+            values[:, i] = batch.column(i + 1).to_numpy(zero_copy_only=False)
+        index = pd.Index(batch.column(0).to_numpy(zero_copy_only=False))
+        yield pd.DataFrame(values, index=index, columns=columns)
+
+
+def load_dlc_csv(
+    path: Path, block_size: int = CSV_BLOCK_BYTES, dtype: np.dtype = np.float32
+) -> pd.DataFrame:
+    chunks = list(iter_dlc_csv(path, block_size, dtype))
+    if not chunks:
+        return pd.DataFrame(columns=_dlc_csv_header(path), dtype=dtype)
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def load_dlc(path: Path, csv_block_size: int = CSV_BLOCK_BYTES) -> pd.DataFrame:
+    # One DLC output file, either the HDF5 export or the CSV export.
+    if path.suffix.lower() == ".csv":
+        return load_dlc_csv(path, csv_block_size)
     return pd.read_hdf(path)
+
+
+def _open_partitioned(root: Path, partition_cols: List[str]) -> ds.Dataset:
+    partitioning = ds.partitioning(
+        pa.schema([(c, pa.string()) for c in partition_cols]), flavor="hive"
+    )
+    return ds.dataset(root, format="parquet", partitioning=partitioning)
+
+
+def _partitioned_names(
+    dataset: ds.Dataset,
+    body_parts: Optional[List[str]],
+    coords: Optional[List[str]],
+    meta_cols: Optional[List[str]],
+) -> List[str]:
+    # Pose columns first, then metadata, matching the combined HDF5 layout.
+    all_columns = sorted(
+        (split_column(name) for name in dataset.schema.names),
+        key=lambda col: col[2] == "",
+    )
+    return [
+        flatten_column(c)
+        for c in select_columns(all_columns, body_parts, coords, meta_cols)
+    ]
+
+
+def _table_to_frame(table: pa.Table, names: List[str]) -> pd.DataFrame:
+    table = table.cast(
+        pa.schema(
+            [
+                pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f
+                for f in table.schema
+            ]
+        )
+    )
+    df = table.to_pandas()
+    df.columns = restore_columns(names)
+    return df
+
+
+def load_partitioned(
+    root: Path,
+    partition_cols: List[str],
+    body_parts: Optional[List[str]] = None,
+    coords: Optional[List[str]] = None,
+    meta_cols: Optional[List[str]] = None,
+    filters: Optional[List[MetaFilter]] = None,
+) -> pd.DataFrame:
+    filters = filters or []
+    dataset = _open_partitioned(root, partition_cols)
+    names = _partitioned_names(
+        dataset, body_parts, coords, _with_filter_columns(meta_cols, filters)
+    )
+    table = dataset.to_table(columns=names, filter=to_arrow_expression(filters))
+    return _drop_filter_columns(_table_to_frame(table, names), meta_cols, filters)
+
+
+def load_dataset(
+    path: Path,
+    partition_cols: List[str],
+    body_parts: Optional[List[str]] = None,
+    coords: Optional[List[str]] = None,
+    meta_cols: Optional[List[str]] = None,
+    filters: Optional[List[MetaFilter]] = None,
+) -> pd.DataFrame:
+    if path.is_dir():
+        return load_partitioned(
+            path, partition_cols, body_parts, coords, meta_cols, filters
+        )
+    return load_h5(path, body_parts, coords, meta_cols, filters)
+
+
+def _h5_session_ranges(
+    store: pd.HDFStore, key: str, group_columns: List[Tuple[str, str, str]]
+) -> Dict[tuple, List[Tuple[int, int]]]:
+    ranges: Dict[tuple, List[Tuple[int, int]]] = {}
+    offset = 0
+    for chunk in store.select(key, columns=group_columns, chunksize=H5_CHUNK_ROWS):
+        values = chunk[group_columns].to_numpy()
+        starts = np.flatnonzero(np.r_[True, (values[1:] != values[:-1]).any(axis=1)])
+        ends = np.r_[starts[1:], len(values)]
+        for start, end in zip(starts, ends):
+            session = tuple(values[start])
+            spans = ranges.setdefault(session, [])
+            if spans and spans[-1][1] == offset + start:
+                spans[-1] = (spans[-1][0], offset + end)
+            else:
+                spans.append((offset + start, offset + end))
+        offset += len(values)
+    return ranges
+
+
+def _iter_h5_sessions(
+    path: Path,
+    group_cols: List[str],
+    body_parts: Optional[List[str]],
+    coords: Optional[List[str]],
+    meta_cols: Optional[List[str]],
+    filters: List[MetaFilter],
+    sort: bool,
+) -> Iterator[pd.DataFrame]:
+    read_meta = _with_filter_columns(meta_cols, filters)
+    with pd.HDFStore(path, mode="r") as store:
+        keys = store.keys()
+        if len(keys) != 1:
+            raise ValueError(f"Expected a single dataset key in {path}, found {keys}")
+        storer = store.get_storer(keys[0])
+
+        if not storer.is_table:
+            # Fixed-format files cannot be read by row range.
+            df = load_h5(path, body_parts, coords, meta_cols, filters)
+            for _, g in df.groupby(group_cols, sort=sort):
+                yield g
+            return
+
+        all_columns = list(storer.non_index_axes[0][1])
+        columns = select_columns(all_columns, body_parts, coords, read_meta)
+        group_columns = [
+            c
+            for name in group_cols
+            for c in all_columns
+            if not is_pose_column(c) and c[0] == name
+        ]
+        ranges = _h5_session_ranges(store, keys[0], group_columns)
+        sessions = sorted(ranges) if sort else list(ranges)
+
+        for session in sessions:
+            parts = [
+                store.select(keys[0], start=start, stop=stop, columns=columns)
+                for start, stop in ranges[session]
+            ]
+            g = pd.concat(parts) if len(parts) > 1 else parts[0]
+            g = g[columns][filter_mask(g, filters)]
+            if len(g):
+                yield _drop_filter_columns(g, meta_cols, filters)
+
+
+def _iter_partitioned_sessions(
+    root: Path,
+    partition_cols: List[str],
+    body_parts: Optional[List[str]],
+    coords: Optional[List[str]],
+    meta_cols: Optional[List[str]],
+    filters: List[MetaFilter],
+    sort: bool,
+) -> Iterator[pd.DataFrame]:
+    dataset = _open_partitioned(root, partition_cols)
+    names = _partitioned_names(
+        dataset, body_parts, coords, _with_filter_columns(meta_cols, filters)
+    )
+    expr = to_arrow_expression(filters)
+
+    fragments: Dict[tuple, list] = {}
+    for fragment in dataset.get_fragments(filter=expr):
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        session = tuple(keys.get(c) for c in partition_cols)
+        fragments.setdefault(session, []).append(fragment)
+    sessions = sorted(fragments) if sort else list(fragments)
+
+    for session in sessions:
+        table = pa.concat_tables(
+            [
+                fragment.to_table(schema=dataset.schema, columns=names, filter=expr)
+                for fragment in fragments[session]
+            ]
+        )
+        if table.num_rows:
+            g = _table_to_frame(table, names)
+            yield _drop_filter_columns(g, meta_cols, filters)
+
+
+def iter_sessions(
+    path: Path,
+    group_cols: List[str],
+    body_parts: Optional[List[str]] = None,
+    coords: Optional[List[str]] = None,
+    meta_cols: Optional[List[str]] = None,
+    filters: Optional[List[MetaFilter]] = None,
+    sort: bool = True,
+) -> Iterator[pd.DataFrame]:
+    filters = filters or []
+    if path.is_dir():
+        return _iter_partitioned_sessions(
+            path, group_cols, body_parts, coords, meta_cols, filters, sort
+        )
+    return _iter_h5_sessions(
+        path, group_cols, body_parts, coords, meta_cols, filters, sort
+    )
@@ -1,15 +1,51 @@
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+from urllib.parse import quote
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from matplotlib.figure import Figure
 
+from dosedynamics.io.columnar import flatten_column, is_pose_column
+
 
 def save_dataframe(df: pd.DataFrame, path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     df.to_parquet(path, index=False)
 
 
+def save_partitioned(
+    df: pd.DataFrame, root: Path, partition_cols: List[str], part_name: str
+) -> List[Path]:
+    names = [flatten_column(c) for c in df.columns]
+    pose_names = [n for c, n in zip(df.columns, names) if is_pose_column(c)]
+    flat = df.set_axis(names, axis=1)
+
+    written: List[Path] = []
+    for keys, part in flat.groupby(partition_cols, sort=False):
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        part_dir = root.joinpath(
+            *(f"{c}={quote(str(v), safe='')}" for c, v in zip(partition_cols, keys))
+        )
+        part = part.drop(columns=partition_cols)
+
+        arrays = []
+        for name in part.columns:
+            values = part[name]
+            if name in pose_names:
+                arrays.append(pa.array(values.to_numpy(), type=pa.float32()))
+            else:
+                arrays.append(pa.array(values.astype(str)).dictionary_encode())
+        table = pa.Table.from_arrays(arrays, names=list(part.columns))
+
+        part_dir.mkdir(parents=True, exist_ok=True)
+        path = part_dir / f"{part_name}.parquet"
+        pq.write_table(table, path)
+        written.append(path)
+    return written
+
+
 def save_figure(fig: Figure, path: Path, dpi: Optional[int] = None) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     fig.savefig(path, dpi=dpi)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _meta_column(data: pd.DataFrame, name: str) -> pd.Series:
+    col = data[name]
+    return col.iloc[:, 0] if isinstance(col, pd.DataFrame) else col
+
+
+@dataclass(frozen=True)
+class SessionIndex:
+    # Rows of session i are order[offsets[i]:offsets[i + 1]], in their
+    # original order. codes and frame are per row: the session number and the
+    # frame number within the session (-1 for rows with a missing key).
+    codes: np.ndarray
+    order: np.ndarray
+    offsets: np.ndarray
+    frame: np.ndarray
+
+    @property
+    def n_sessions(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def window(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        # Rows whose frame number lies in [start, stop) of their session.
+        mask = self.frame >= start
+        if stop is not None:
+            mask &= self.frame < stop
+        return mask
+
+
+def build_session_index(
+    data: pd.DataFrame, group_cols: List[str], sort: bool = True
+) -> SessionIndex:
+    keys = pd.DataFrame({c: _meta_column(data, c) for c in group_cols})
+    codes = keys.groupby(group_cols, sort=sort).ngroup()
+    codes = codes.fillna(-1).to_numpy(dtype=np.int64)
+    keep = np.flatnonzero(codes >= 0)
+    order = keep[np.argsort(codes[keep], kind="stable")]
+    counts = np.bincount(codes[keep]) if len(keep) else np.zeros(0, np.int64)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    frame = np.full(len(data), -1, dtype=np.int64)
+    frame[order] = np.arange(len(order)) - np.repeat(offsets[:-1], counts)
+    return SessionIndex(codes=codes, order=order, offsets=offsets, frame=frame)
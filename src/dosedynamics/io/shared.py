@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dosedynamics.io.session_index import build_session_index
+from dosedynamics.preprocessing.trajectory import POSE_COLUMNS, SessionTrajectory
+
+COORDS = ("x", "y", "likelihood")
+
+
+@dataclass(frozen=True)
+class SharedTrajectories:
+    # Picklable description of the shared blocks: workers attach by name.
+    block_names: Dict[str, str]
+    columns: pd.Index
+    meta_dtypes: tuple
+    frame_dtypes: Dict[str, str]
+    layout: Tuple[tuple, ...]
+    n_rows: int
+    n_parts: int
+    n_sessions: int
+    dtype: str
+
+
+def _pose_key(col: Any) -> Tuple[str, str] | None:
+    if isinstance(col, tuple):
+        if len(col) == 3 and col[2] in COORDS:
+            return col[1], col[2]
+        return None
+    if col in COORDS:
+        return "", col
+    return None
+
+
+def _is_frame_column(series: pd.Series) -> bool:
+    # Numeric non-pose columns (e.g. per-frame features) vary along the
+    # session and get their own block; everything else is session metadata.
+    return pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(
+        series.dtype, pd.CategoricalDtype
+    )
+
+
+# Owner side of the shared blocks: sessions are gathered into contiguous row
+# ranges once, and the blocks are unlinked on close.
+class SharedTrajectoryStore:
+    def __init__(self, data: pd.DataFrame, by: List[str], sort: bool = True) -> None:
+        index = build_session_index(data, by, sort)
+        perm = index.order
+        offsets = index.offsets
+
+        parts: List[str] = []
+        layout = []
+        meta_cols = []
+        pose_cols = []
+        frame_cols = []
+        for col in data.columns:
+            key = _pose_key(col)
+            if key is None and _is_frame_column(data[col]):
+                layout.append(("frame", f"frame{len(frame_cols)}"))
+                frame_cols.append(col)
+                continue
+            if key is None:
+                layout.append(("meta", len(meta_cols)))
+                meta_cols.append(col)
+                continue
+            if key[0] not in parts:
+                parts.append(key[0])
+            layout.append(("pose", key[1], parts.index(key[0])))
+            pose_cols.append(col)
+
+        dtype = (
+            np.result_type(*[data[c].dtype for c in pose_cols])
+            if pose_cols
+            else np.dtype(np.float64)
+        )
+        n_rows = len(perm)
+        self._blocks: List[shared_memory.SharedMemory] = []
+        names: Dict[str, str] = {}
+        arrays: Dict[str, np.ndarray] = {}
+        for coord in COORDS:
+            arrays[coord] = self._allocate(
+                names, coord, (max(len(parts), 1), n_rows), dtype
+            )
+            arrays[coord][:] = np.nan
+        arrays["offsets"] = self._allocate(
+            names, "offsets", offsets.shape, offsets.dtype
+        )
+        arrays["offsets"][:] = offsets
+        frame_dtypes: Dict[str, str] = {}
+        for col, spec in zip(data.columns, layout):
+            if spec[0] == "frame":
+                values = data[col].to_numpy()
+                frame_dtypes[spec[1]] = values.dtype.str
+                arrays[spec[1]] = self._allocate(
+                    names, spec[1], (n_rows,), values.dtype
+                )
+                arrays[spec[1]][:] = values[perm]
+
+        for col, spec in zip(data.columns, layout):
+            if spec[0] == "pose":
+                arrays[spec[1]][spec[2]] = data[col].to_numpy()[perm]
+
+        firsts = perm[offsets[:-1]]
+        meta_values = [data[col].to_numpy()[firsts] for col in meta_cols]
+        self.session_meta: List[tuple] = [
+            tuple(values[i] for values in meta_values) for i in range(index.n_sessions)
+        ]
+        self.handle = SharedTrajectories(
+            block_names=names,
+            columns=data.columns,
+            meta_dtypes=tuple(data[col].dtype for col in meta_cols),
+            frame_dtypes=frame_dtypes,
+            layout=tuple(layout),
+            n_rows=n_rows,
+            n_parts=len(parts),
+            n_sessions=index.n_sessions,
+            dtype=dtype.str,
+        )
+
+    def _allocate(
+        self, names: Dict[str, str], key: str, shape: tuple, dtype: np.dtype
+    ) -> np.ndarray:
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self._blocks.append(block)
+        names[key] = block.name
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def tasks(self) -> List[Tuple[int, tuple]]:
+        return list(enumerate(self.session_meta))
+
+    def close(self) -> None:
+        _ATTACHED.pop(self.handle.block_names["offsets"], None)
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedTrajectoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Blocks attached in this process, keyed by the offsets block name so each
+# worker attaches once per dataset rather than once per session.
+_ATTACHED: Dict[str, tuple] = {}
+
+
+def attach(handle: SharedTrajectories) -> Dict[str, np.ndarray]:
+    key = handle.block_names["offsets"]
+    if key not in _ATTACHED:
+        blocks = []
+        arrays: Dict[str, np.ndarray] = {}
+        for coord in COORDS:
+            block = shared_memory.SharedMemory(name=handle.block_names[coord])
+            blocks.append(block)
+            arrays[coord] = np.ndarray(
+                (max(handle.n_parts, 1), handle.n_rows),
+                dtype=np.dtype(handle.dtype),
+                buffer=block.buf,
+            )
+        for name, dtype in handle.frame_dtypes.items():
+            block = shared_memory.SharedMemory(name=handle.block_names[name])
+            blocks.append(block)
+            arrays[name] = np.ndarray(
+                (handle.n_rows,), dtype=np.dtype(dtype), buffer=block.buf
+            )
+        block = shared_memory.SharedMemory(name=key)
+        blocks.append(block)
+        arrays["offsets"] = np.ndarray(
+            (handle.n_sessions + 1,), dtype=np.int64, buffer=block.buf
+        )
+        _ATTACHED[key] = (blocks, arrays)
+    return _ATTACHED[key][1]
+
+
+def session_frame(
+    handle: SharedTrajectories, session: int, meta: tuple
+) -> pd.DataFrame:
+    arrays = attach(handle)
+    offsets = arrays["offsets"]
+    start, stop = int(offsets[session]), int(offsets[session + 1])
+    index = pd.RangeIndex(start, stop)
+    data = {}
+    for pos, spec in enumerate(handle.layout):
+        if spec[0] == "pose":
+            data[pos] = arrays[spec[1]][spec[2], start:stop]
+        elif spec[0] == "frame":
+            data[pos] = arrays[spec[1]][start:stop]
+        else:
+            data[pos] = pd.Series(
+                meta[spec[1]], index=index, dtype=handle.meta_dtypes[spec[1]]
+            )
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.columns = handle.columns
+    return df
+
+
+def session_trajectory(
+    handle: SharedTrajectories, session: int, meta: tuple, meta_cols: List[str]
+) -> SessionTrajectory:
+    # Single-part flat tables only (e.g. frame features): the arrays are
+    # views of the shared blocks and no per-frame metadata is materialized.
+    arrays = attach(handle)
+    offsets = arrays["offsets"]
+    start, stop = int(offsets[session]), int(offsets[session + 1])
+    values: Dict[Any, np.ndarray] = {}
+    session_meta: Dict[Any, Any] = {}
+    for col, spec in zip(handle.columns, handle.layout):
+        if spec[0] == "pose":
+            values[col] = arrays[spec[1]][spec[2], start:stop]
+        elif spec[0] == "frame":
+            values[col] = arrays[spec[1]][start:stop]
+        else:
+            session_meta[col] = meta[spec[1]]
+    for col in meta_cols:
+        if col in values:
+            session_meta[col] = values.pop(col)[0]
+    pose = [values.pop(col) for col in POSE_COLUMNS]
+    return SessionTrajectory(
+        {col: session_meta[col] for col in meta_cols}, *pose, values
+    )
+
+
+def call_on_session(
+    func: Callable[[pd.DataFrame], Any],
+    handle: SharedTrajectories,
+    task: Tuple[int, tuple],
+) -> Any:
+    session, meta = task
+    return func(session_frame(handle, session, meta))
+
+
+def call_on_trajectory(
+    func: Callable[[SessionTrajectory], Any],
+    handle: SharedTrajectories,
+    meta_cols: List[str],
+    task: Tuple[int, tuple],
+) -> Any:
+    session, meta = task
+    return func(session_trajectory(handle, session, meta, meta_cols))
+
+
+@dataclass(frozen=True)
+class SharedArrayHandle:
+    name: str
+    shape: tuple
+    dtype: str
+
+
+# Owner of a single array in shared memory (e.g. a TCA tensor); workers get
+# the handle and attach read-only views instead of unpickling a copy.
+class SharedArray:
+    def __init__(self, array: np.ndarray) -> None:
+        array = np.asarray(array)
+        self._block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._block.buf)
+        view[...] = array
+        self.handle = SharedArrayHandle(self._block.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        _ATTACHED.pop(self.handle.name, None)
+        self._block.close()
+        self._block.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach_array(handle: SharedArrayHandle) -> np.ndarray:
+    if handle.name not in _ATTACHED:
+        block = shared_memory.SharedMemory(name=handle.name)
+        array = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=block.buf)
+        array.flags.writeable = False
+        _ATTACHED[handle.name] = ([block], array)
+    return _ATTACHED[handle.name][1]
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
 from dosedynamics.analysis.arrest_analysis import ArrestAnalysis
 from dosedynamics.analysis.center_crossings import CenterCrossingsAnalysis
 from dosedynamics.analysis.dispersion import DispersionAnalysis
 from dosedynamics.analysis.speed_bins import SpeedBinsAnalysis
 from dosedynamics.analysis.speed_distance import SpeedDistanceAnalysis
-from dosedynamics.analysis.tca_per_animal import TCAPerAnimalAnalysis
+from dosedynamics.analysis.tca_per_animal import TCAPerAnimalAnalysis, TCAResults
 from dosedynamics.analysis.thigmotaxis import ThigmotaxisAnalysis
 from dosedynamics.config import Config
+from dosedynamics.io.cache import ArtifactCache
+from dosedynamics.io.dataset import DatasetStore
 from dosedynamics.io.savers import save_figure
 from dosedynamics.plotting.arrest import ArrestPlotter
 from dosedynamics.plotting.center_crossings import CenterCrossingsPlotter
@@ -26,13 +32,16 @@ class Pipeline:
         self.cfg = cfg
         self.logger = logger
         self.paths = PathManager(cfg)
-        self.analysis = TCAPerAnimalAnalysis(cfg, logger)
-        self.speed_bins = SpeedBinsAnalysis(cfg, logger)
-        self.speed_distance = SpeedDistanceAnalysis(cfg, logger)
-        self.thigmotaxis = ThigmotaxisAnalysis(cfg, logger)
-        self.dispersion = DispersionAnalysis(cfg, logger)
-        self.center_crossings = CenterCrossingsAnalysis(cfg, logger)
-        self.arrests = ArrestAnalysis(cfg, logger)
+        self.store = DatasetStore(cfg, logger)
+        self.cache = ArtifactCache(cfg, logger)
+        self._stage_results: Dict[str, Any] = {}
+        self.analysis = TCAPerAnimalAnalysis(cfg, logger, self.store)
+        self.speed_bins = SpeedBinsAnalysis(cfg, logger, self.store)
+        self.speed_distance = SpeedDistanceAnalysis(cfg, logger, self.store)
+        self.thigmotaxis = ThigmotaxisAnalysis(cfg, logger, self.store)
+        self.dispersion = DispersionAnalysis(cfg, logger, self.store)
+        self.center_crossings = CenterCrossingsAnalysis(cfg, logger, self.store)
+        self.arrests = ArrestAnalysis(cfg, logger, self.store)
         self.assembler = DLCCombinedBuilder(cfg, logger)
         self.arena_points = ArenaPointsAnnotator(cfg, logger)
         self.plotter = TCAPlotter(
@@ -57,20 +66,46 @@ class Pipeline:
         )
         self.arrest_plotter = ArrestPlotter(cfg.plotting, cfg.analysis.arrest_analysis)
 
+    def _cached(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        cache_config: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        if key in self._stage_results:
+            self.logger.info("Reusing cached %s from an earlier stage", key)
+            return self._stage_results[key]
+        if cache_config is None:
+            result = compute()
+        else:
+            result = self.cache.get_or_compute(key, cache_config, compute)
+        self._stage_results[key] = result
+        return result
+
     def run_arena_points(self) -> None:
         self.arena_points.run()
 
     def run_assemble(self) -> None:
         self.assembler.run()
 
-    def run_preprocess(self) -> None:
-        self.analysis.prepare_bin_df()
+    def run_preprocess(self) -> pd.DataFrame:
+        return self._cached(
+            "bin_df",
+            self.analysis.prepare_bin_df,
+            self.analysis.bin_cache_config(),
+        )
 
-    def run_analyze(self):
-        return self.analysis.run()
+    def run_analyze(self) -> TCAResults:
+        return self._cached(
+            "tca_results",
+            lambda: self.analysis.run(bin_df=self.run_preprocess()),
+            self.analysis.cache_config(),
+        )
 
     def run_speed_bins(self) -> None:
-        results = self.speed_bins.run()
+        results = self._cached(
+            "speed_bins", self.speed_bins.run, self.speed_bins.cache_config()
+        )
         fig, _ = self.speed_bins_plotter.plot_distribution(
             results.bin_speeds, results.stats
         )
@@ -80,7 +115,11 @@ class Pipeline:
             self.logger.info("Saved speed bin figure to %s", figures_dir)
 
     def run_speed_distance(self) -> None:
-        results = self.speed_distance.run()
+        results = self._cached(
+            "speed_distance",
+            self.speed_distance.run,
+            self.speed_distance.cache_config(),
+        )
         for metric, stats in results.stats_by_metric.items():
             fig, _ = self.speed_distance_plotter.plot_metric(
                 results.per_group, metric, stats
@@ -94,7 +133,9 @@ class Pipeline:
                 self.logger.info("Saved %s plot to %s", metric, figures_dir)
 
     def run_thigmotaxis(self) -> None:
-        results = self.thigmotaxis.run()
+        results = self._cached(
+            "thigmotaxis", self.thigmotaxis.run, self.thigmotaxis.cache_config()
+        )
         fig, _ = self.thigmotaxis_plotter.plot_metric(results.per_group, results.stats)
         if self.cfg.analysis.thigmotaxis.save_figures:
             figures_dir = self.paths.figures_dir()
@@ -104,7 +145,9 @@ class Pipeline:
             self.logger.info("Saved thigmotaxis plot to %s", figures_dir)
 
     def run_dispersion(self) -> None:
-        results = self.dispersion.run()
+        results = self._cached(
+            "dispersion", self.dispersion.run, self.dispersion.cache_config()
+        )
         fig, _ = self.dispersion_plotter.plot_distributions(
             results.per_bin, results.stats
         )
@@ -114,7 +157,11 @@ class Pipeline:
             self.logger.info("Saved dispersion plot to %s", figures_dir)
 
     def run_center_crossings(self) -> None:
-        results = self.center_crossings.run()
+        results = self._cached(
+            "center_crossings",
+            self.center_crossings.run,
+            self.center_crossings.cache_config(),
+        )
         fig, _ = self.center_crossings_plotter.plot_crossings(
             results.per_group, results.stats
         )
@@ -126,7 +173,7 @@ class Pipeline:
             self.logger.info("Saved center crossings plot to %s", figures_dir)
 
     def run_arrests(self) -> None:
-        results = self.arrests.run()
+        results = self._cached("arrests", self.arrests.run, self.arrests.cache_config())
         if results.arrests.empty:
             self.logger.info("No arrests detected; skipping plots")
             return
@@ -159,8 +206,38 @@ class Pipeline:
     def run_tca(self) -> None:
         self.run_plot()
 
+    def run_tca_ranks(self) -> None:
+        results = self._cached(
+            "tca_rank_sweep",
+            lambda: self.analysis.rank_sweep(bin_df=self.run_preprocess()),
+            self.analysis.cache_config(),
+        )
+        table_path = (
+            self.paths.reports_dir() / self.cfg.analysis.tca.sweep_table_filename
+        )
+        table_path.parent.mkdir(parents=True, exist_ok=True)
+        results.table.to_csv(table_path, index=False)
+        self.logger.info("Saved TCA rank sweep to %s", table_path)
+
+        fig, _ = self.plotter.plot_rank_sweep(results.table)
+        if self.cfg.plotting.save.enabled:
+            figures_dir = self.paths.figures_dir()
+            save_figure(fig, figures_dir / self.cfg.plotting.save.rank_sweep_filename)
+            self.logger.info("Saved TCA rank sweep figure to %s", figures_dir)
+
+    def run_tca_cv(self) -> None:
+        results = self._cached(
+            "tca_cv",
+            lambda: self.analysis.cross_validate(bin_df=self.run_preprocess()),
+            self.analysis.cache_config(),
+        )
+        table_path = self.paths.reports_dir() / self.cfg.analysis.tca.cv_table_filename
+        table_path.parent.mkdir(parents=True, exist_ok=True)
+        results.folds.to_csv(table_path, index=False)
+        self.logger.info("Saved TCA cross-validation folds to %s", table_path)
+
     def run_plot(self) -> None:
-        results = self.analysis.run()
+        results = self.run_analyze()
 
         fig_factors, _ = self.plotter.plot_factors(
             results.factors,
@@ -185,3 +262,4 @@ class Pipeline:
         self.run_preprocess()
         self.run_analyze()
         self.run_plot()
+        self.store.log_summary()
@@ -192,3 +192,33 @@ class TCAPlotter:
         axes[0].set_ylabel(self.plot_cfg.loadings.ylabel_loading)
         fig.tight_layout()
         return fig, axes
+
+    def plot_rank_sweep(self, table: pd.DataFrame) -> tuple:
+        cfg = self.plot_cfg.rank_sweep
+        fig, axes = plt.subplots(1, 3, figsize=cfg.fig_size)
+        panels = [
+            ("error", cfg.title_error),
+            ("core_consistency", cfg.title_consistency),
+            ("similarity", cfg.title_similarity),
+        ]
+        for ax, (column, title) in zip(axes, panels):
+            ax.plot(
+                table["rank"],
+                table[column],
+                marker="o",
+                color=self.plot_cfg.style.edge_color,
+                linewidth=self.plot_cfg.style.factor_line_width,
+            )
+            ax.set_title(title)
+            ax.set_xlabel(cfg.xlabel_rank)
+            ax.set_xticks(table["rank"])
+            ax.spines["top"].set_visible(False)
+            ax.spines["right"].set_visible(False)
+            for spine in ax.spines.values():
+                spine.set_linewidth(self.plot_cfg.style.line_width)
+        # Core consistency of an overfitted rank can be hugely negative; the
+        # interesting range is 0-100.
+        bottom = max(float(np.nanmin(table["core_consistency"])), -100.0)
+        axes[1].set_ylim(min(bottom, 0.0) - 5, 105)
+        fig.tight_layout()
+        return fig, axes
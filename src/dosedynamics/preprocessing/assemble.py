@@ -1,18 +1,28 @@
 from __future__ import annotations
 
+import json
 import re
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, List, Tuple
 
-import cv2
 import numpy as np
 import pandas as pd
 
 from dosedynamics.config import Config, MetadataFieldConfig
-from dosedynamics.preprocessing.transform import transform_dlc_coords_to_cm
+from dosedynamics.io.cache import file_identity
+from dosedynamics.io.loaders import load_dlc
+from dosedynamics.io.savers import save_partitioned
+from dosedynamics.preprocessing.transform import (
+    perspective_matrix,
+    transform_dlc_coords_to_cm,
+)
+from dosedynamics.utils.parallel import ordered_map, resolve_jobs
 from dosedynamics.utils.paths import PathManager
 
+MANIFEST_VERSION = 1
+
 
 @dataclass
 class ParsedMetadata:
@@ -79,21 +89,176 @@ class DLCCombinedBuilder:
                 return admin
         return self.cfg.dataset_build.administration.default
 
-    def _apply_perspective_transform(
-        self, df: pd.DataFrame, corners: np.ndarray
-    ) -> pd.DataFrame:
-        src = corners.astype(np.float32)
-        dst = np.array(
-            [
-                [0, 0],
-                [self.cfg.arena.width_cm, 0],
-                [self.cfg.arena.width_cm, self.cfg.arena.length_cm],
-                [0, self.cfg.arena.length_cm],
-            ],
-            dtype=np.float32,
-        )
-        matrix = cv2.getPerspectiveTransform(src, dst)
-        return transform_dlc_coords_to_cm(df, matrix)
+    def _output_path(self) -> Path:
+        if self.cfg.dataset_build.storage == "parquet":
+            return self.paths.resolve(self.cfg.dataset_build.output_dir)
+        return self.paths.resolve(self.cfg.dataset_build.output_h5)
+
+    def _hdf_rows(self) -> int:
+        output = self._output_path()
+        if not output.exists():
+            return 0
+        key = self.cfg.dataset_build.output_key
+        with pd.HDFStore(output, mode="r") as store:
+            return int(store.get_storer(key).nrows) if key in store else 0
+
+    def _write(self, norm_data: pd.DataFrame, source: Path) -> Dict[str, Any]:
+        # Returns where the file's rows went, for the manifest.
+        storage = self.cfg.dataset_build.storage
+        if storage == "hdf5":
+            start = self._hdf_rows()
+            norm_data.to_hdf(
+                self._output_path(),
+                key=self.cfg.dataset_build.output_key,
+                mode=self.cfg.dataset_build.output_mode,
+                format=self.cfg.dataset_build.output_format,
+                append=self.cfg.dataset_build.append,
+            )
+            return {"rows": [start, start + len(norm_data)]}
+        elif storage == "parquet":
+            root = self._output_path()
+            parts = save_partitioned(
+                norm_data,
+                root,
+                partition_cols=self.cfg.input.group_cols,
+                part_name=source.stem,
+            )
+            return {"parts": [p.relative_to(root).as_posix() for p in parts]}
+        else:
+            raise ValueError(f"Unknown dataset storage '{storage}'")
+
+    def _sidecar_path(self, name: str) -> Path:
+        # JSON files kept next to the output; inside a parquet directory they
+        # start with "_" so that dataset readers skip them.
+        output = self._output_path()
+        if self.cfg.dataset_build.storage == "parquet":
+            return output / f"_{name}.json"
+        return output.with_name(f"{output.name}.{name}.json")
+
+    def _homographies(
+        self, corners_map: Dict[str, np.ndarray], videos: List[str]
+    ) -> Dict[str, np.ndarray]:
+        # One pixel-to-cm homography per video, cached next to the output and
+        # recomputed only when the corners or arena size change.
+        path = self._sidecar_path("homographies")
+        cache = json.loads(path.read_text()) if path.exists() else {}
+        arena = [self.cfg.arena.width_cm, self.cfg.arena.length_cm]
+        matrices: Dict[str, np.ndarray] = {}
+        for video in dict.fromkeys(videos):
+            if video not in corners_map:
+                raise KeyError(f"No arena corners for video '{video}'")
+            corners = corners_map[video].tolist()
+            entry = cache.get(video, {})
+            stale = entry.get("corners") != corners or entry.get("arena_cm") != arena
+            if stale:
+                matrix = perspective_matrix(corners_map[video], *arena)
+                entry = {
+                    "corners": corners,
+                    "arena_cm": arena,
+                    "matrix": matrix.tolist(),
+                }
+                cache[video] = entry
+            matrices[video] = np.array(entry["matrix"])
+        if matrices:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+        return matrices
+
+    def _incremental(self) -> bool:
+        build = self.cfg.dataset_build
+        if not build.incremental:
+            return False
+        if build.storage == "hdf5" and not (
+            build.output_mode == "a" and build.output_format == "table" and build.append
+        ):
+            self.logger.warning(
+                "Incremental assembly needs an appendable HDF5 table (output_mode=a, "
+                "output_format=table, append=true); processing all files"
+            )
+            return False
+        return True
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        path = self._sidecar_path("manifest")
+        output = self._output_path()
+        if not path.exists():
+            if output.exists():
+                self.logger.warning(
+                    "%s has no manifest; all input files are appended to it", output
+                )
+            return {}
+        if not output.exists():
+            self.logger.warning("Ignoring manifest %s without its output", path)
+            return {}
+        return json.loads(path.read_text())["files"]
+
+    def _save_manifest(self, manifest: Dict[str, Dict[str, Any]]) -> None:
+        path = self._sidecar_path("manifest")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        blob = {"version": MANIFEST_VERSION, "files": manifest}
+        path.write_text(json.dumps(blob, indent=2, sort_keys=True))
+
+    def _plan(
+        self, files: List[Path], input_dir: Path, manifest: Dict[str, Dict[str, Any]]
+    ) -> Tuple[List[Path], List[str], List[str], List[str]]:
+        # New and changed files are (re)processed. Size and mtime decide
+        # quickly; the content hash only when they differ. Files whose hash
+        # still matches are refreshed in the manifest so the next run takes
+        # the quick path again.
+        todo: List[Path] = []
+        changed: List[str] = []
+        skipped: List[str] = []
+        refreshed: List[str] = []
+        for path in files:
+            key = path.relative_to(input_dir).as_posix()
+            entry = manifest.get(key)
+            if entry is None:
+                todo.append(path)
+                continue
+            stat = path.stat()
+            if (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                skipped.append(key)
+                continue
+            identity = file_identity(path, hash_content=True)
+            if identity["sha256"] == entry["sha256"]:
+                entry.update(identity)
+                skipped.append(key)
+                refreshed.append(key)
+                continue
+            todo.append(path)
+            changed.append(key)
+        return todo, changed, skipped, refreshed
+
+    def _drop(self, manifest: Dict[str, Dict[str, Any]], keys: List[str]) -> None:
+        # Remove the rows of the given files from the output.
+        if self.cfg.dataset_build.storage == "parquet":
+            root = self._output_path()
+            for key in keys:
+                for part in manifest.pop(key)["parts"]:
+                    (root / part).unlink(missing_ok=True)
+            return
+
+        output_key = self.cfg.dataset_build.output_key
+        ranges = sorted((manifest.pop(key)["rows"] for key in keys), reverse=True)
+        with pd.HDFStore(self._output_path(), mode="a") as store:
+            for start, stop in ranges:
+                store.remove(output_key, start=start, stop=stop)
+                for entry in manifest.values():
+                    if entry["rows"][0] >= stop:
+                        entry["rows"] = [r - (stop - start) for r in entry["rows"]]
+
+    def _prepare(self, matrices: Dict[str, np.ndarray], path: Path) -> pd.DataFrame:
+        self.logger.info("Processing %s", path)
+        data = load_dlc(path, self.cfg.dataset_build.csv_block_size)
+        metadata = self._extract_metadata(path)
+        video_name = self._build_video_name(path.name)
+        animal_id = metadata.fields.get("animal_id", "")
+
+        data["video_name"] = video_name
+        data["administration"] = self._map_administration(animal_id)
+        for key, value in metadata.fields.items():
+            data[key] = value
+        return transform_dlc_coords_to_cm(data, matrices[video_name])
 
     def run(self) -> None:
         input_dir = self.paths.resolve(self.cfg.dataset_build.input_dir)
@@ -104,28 +269,53 @@ class DLCCombinedBuilder:
             )
 
         corners_map = self._load_arena_corners()
-        output_path = self.paths.resolve(self.cfg.dataset_build.output_h5)
-
-        for path in files:
-            self.logger.info("Processing %s", path)
-            data = pd.read_hdf(path)
-            metadata = self._extract_metadata(path)
-            video_name = self._build_video_name(path.name)
-            animal_id = metadata.fields.get("animal_id", "")
 
-            data["video_name"] = video_name
-            data["administration"] = self._map_administration(animal_id)
-            for key, value in metadata.fields.items():
-                data[key] = value
+        incremental = self._incremental()
+        manifest = self._load_manifest() if incremental else {}
+        todo, changed, skipped, refreshed = self._plan(files, input_dir, manifest)
+        if refreshed:
+            self._save_manifest(manifest)
+        if skipped:
+            self.logger.info("Skipping %d unchanged file(s)", len(skipped))
+            for key in skipped:
+                self.logger.debug("Unchanged: %s", key)
+        present = {path.relative_to(input_dir).as_posix() for path in files}
+        missing = sorted(set(manifest) - present)
+        if missing:
+            self.logger.info(
+                "%d ingested file(s) no longer in %s; keeping their rows",
+                len(missing),
+                input_dir,
+            )
+        if changed:
+            self.logger.info("Replacing rows of %d changed file(s)", len(changed))
+            self._drop(manifest, changed)
+            self._save_manifest(manifest)
 
-            if video_name not in corners_map:
-                raise KeyError(f"No arena corners for video '{video_name}'")
-            norm_data = self._apply_perspective_transform(data, corners_map[video_name])
+        # Workers read and transform files; this process is the only writer
+        # and appends them in file order, so the output matches a serial run.
+        jobs = resolve_jobs(self.cfg.parallel.jobs)
+        if jobs > 1 and len(todo) > 1:
+            self.logger.info("Reading %d files with %d workers", len(todo), jobs)
+        matrices = self._homographies(
+            corners_map, [self._build_video_name(path.name) for path in todo]
+        )
+        prepared = ordered_map(partial(self._prepare, matrices), todo, jobs)
+        for path, norm_data in zip(todo, prepared):
+            self.logger.info("Writing %s", path)
+            location = self._write(norm_data, path)
+            if incremental:
+                key = path.relative_to(input_dir).as_posix()
+                manifest[key] = {
+                    **file_identity(path, hash_content=True),
+                    **location,
+                    "n_rows": len(norm_data),
+                }
+                self._save_manifest(manifest)
 
-            norm_data.to_hdf(
-                output_path,
-                key=self.cfg.dataset_build.output_key,
-                mode=self.cfg.dataset_build.output_mode,
-                format=self.cfg.dataset_build.output_format,
-                append=self.cfg.dataset_build.append,
-            )
+        self.logger.info(
+            "Assembled %d new and %d changed file(s); skipped %d unchanged",
+            len(todo) - len(changed),
+            len(changed),
+            len(skipped),
+        )
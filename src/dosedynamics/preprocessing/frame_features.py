@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dosedynamics.config import Config
+from dosedynamics.io.session_index import SessionIndex, build_session_index
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
+
+FRAME_FEATURE_COLUMNS = [
+    "frame",
+    "valid",
+    "valid_rank",
+    "x",
+    "y",
+    "likelihood",
+    "step_dist",
+    "speed",
+    "dist_from_wall",
+    "in_center",
+    "in_border",
+]
+
+
+def compute_frame_features(
+    df: pd.DataFrame,
+    group_cols: List[str],
+    fps: float,
+    likelihood_threshold: float,
+    width_cm: float,
+    length_cm: float,
+    border_frac: float,
+    center_frac: float,
+    index: Optional[SessionIndex] = None,
+) -> pd.DataFrame:
+    # One pass over body-part trajectories (x, y, likelihood plus metadata,
+    # any number of sessions). Rows keep their order and index:
+    #   frame       position of the frame within its session (-1 without one)
+    #   valid       likelihood >= likelihood_threshold
+    #   valid_rank  position among the session's valid frames (-1 if invalid)
+    #   step_dist   distance to the previous valid frame (NaN for the first)
+    if index is None:
+        index = build_session_index(df, group_cols)
+    order = index.order
+    session = np.repeat(np.arange(index.n_sessions), index.lengths)
+
+    x = df["x"].to_numpy()
+    y = df["y"].to_numpy()
+    likelihood = df["likelihood"].to_numpy()
+    valid = likelihood >= likelihood_threshold
+
+    valid_sorted = valid[order]
+    valid_count = np.cumsum(valid_sorted)
+    start_count = np.r_[0, valid_count][index.offsets[:-1]]
+    valid_rank = np.full(len(df), -1, dtype=np.int64)
+    valid_rank[order[valid_sorted]] = (
+        valid_count - np.repeat(start_count, index.lengths) - 1
+    )[valid_sorted]
+
+    # Consecutive valid frames of the same session, in session order.
+    idx = order[valid_sorted]
+    same = session[valid_sorted][1:] == session[valid_sorted][:-1]
+    step_dist = np.full(len(df), np.nan, dtype=np.result_type(x.dtype, y.dtype))
+    dx = x[idx[1:]] - x[idx[:-1]]
+    dy = y[idx[1:]] - y[idx[:-1]]
+    step_dist[idx[1:][same]] = np.sqrt(dx**2 + dy**2)[same]
+
+    dist_from_wall = np.minimum.reduce([x, width_cm - x, y, length_cm - y])
+    center_x_min = (1 - center_frac) / 2 * width_cm
+    center_y_min = (1 - center_frac) / 2 * length_cm
+    in_center = (
+        (x >= center_x_min)
+        & (x <= width_cm - center_x_min)
+        & (y >= center_y_min)
+        & (y <= length_cm - center_y_min)
+    )
+
+    features = pd.DataFrame(
+        {
+            "frame": index.frame,
+            "valid": valid,
+            "valid_rank": valid_rank,
+            "x": x,
+            "y": y,
+            "likelihood": likelihood,
+            "step_dist": step_dist,
+            "speed": step_dist * fps,
+            "dist_from_wall": dist_from_wall,
+            "in_center": in_center,
+            "in_border": dist_from_wall <= border_frac * min(width_cm, length_cm),
+        },
+        index=df.index,
+    )
+    meta = df.drop(columns=["x", "y", "likelihood"])
+    return pd.concat([meta, features], axis=1)
+
+
+def within_cutoff(session: SessionTrajectory, cutoff_frames: int) -> SessionTrajectory:
+    # Valid frames among the first cutoff_frames of a session.
+    return session.take(session["valid"] & (session["frame"] < cutoff_frames))
+
+
+def first_valid(session: SessionTrajectory, cutoff_frames: int) -> SessionTrajectory:
+    # The first cutoff_frames valid frames of a session.
+    return session.take(session["valid"] & (session["valid_rank"] < cutoff_frames))
+
+
+def frame_features(
+    cfg: Config, df: pd.DataFrame, index: Optional[SessionIndex] = None
+) -> pd.DataFrame:
+    return compute_frame_features(
+        df,
+        group_cols=cfg.input.group_cols,
+        fps=cfg.preprocessing.fps,
+        likelihood_threshold=cfg.preprocessing.likelihood_threshold,
+        width_cm=cfg.arena.width_cm,
+        length_cm=cfg.arena.length_cm,
+        border_frac=cfg.analysis.thigmotaxis.margin_frac,
+        center_frac=cfg.analysis.center_crossings.inner_frac,
+        index=index,
+    )
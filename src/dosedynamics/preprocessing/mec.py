@@ -1,11 +1,162 @@
 from __future__ import annotations
 
-from typing import Optional
+from itertools import combinations
+from typing import Optional, Tuple
 
-import cv2
 import numpy as np
 import pandas as pd
 
+# Relative slack when testing whether a point lies inside a circle.
+_MEC_RTOL = 1e-9
+
+# Extreme-point directions in counter-clockwise order: their extreme points
+# form a convex octagon whose strict interior cannot hold hull vertices.
+_OCTAGON_DIRECTIONS = np.array(
+    [[1, 0], [1, 1], [0, 1], [-1, 1], [-1, 0], [-1, -1], [0, -1], [1, -1]],
+    dtype=np.float64,
+)
+
+_PAIRS = list(combinations(range(4), 2))
+_TRIPLES = list(combinations(range(4), 3))
+
+
+def _segment_argmax(
+    values: np.ndarray, bin_ids: np.ndarray, starts: np.ndarray
+) -> np.ndarray:
+    # Index of the first maximum within each bin; values are grouped by bin
+    # and every bin is non-empty.
+    peak = np.maximum.reduceat(values, starts)
+    index = np.where(values == peak[bin_ids], np.arange(len(values)), len(values))
+    return np.minimum.reduceat(index, starts)
+
+
+def _prune_interior(
+    points: np.ndarray, bin_ids: np.ndarray, starts: np.ndarray
+) -> np.ndarray:
+    # Akl-Toussaint heuristic: drop points strictly inside the octagon spanned
+    # by each bin's extreme points in eight directions.
+    proj = points @ _OCTAGON_DIRECTIONS.T
+    vertices = np.stack(
+        [
+            points[_segment_argmax(proj[:, k], bin_ids, starts)]
+            for k in range(len(_OCTAGON_DIRECTIONS))
+        ],
+        axis=1,
+    )
+    x, y = points[:, 0], points[:, 1]
+    inside = np.ones(len(points), dtype=bool)
+    n_edges = len(_OCTAGON_DIRECTIONS)
+    for k in range(n_edges):
+        a = vertices[:, k]
+        edge = vertices[:, (k + 1) % n_edges] - a
+        # Edges between coinciding extreme points do not constrain anything.
+        degenerate = (edge == 0).all(axis=1)
+        ex, ey = edge[bin_ids, 0], edge[bin_ids, 1]
+        cross = ex * (y - a[bin_ids, 1]) - ey * (x - a[bin_ids, 0])
+        inside &= (cross > 0) | degenerate[bin_ids]
+    # A bin whose extreme points all coincide has no interior.
+    inside &= ~(vertices == vertices[:, :1]).all(axis=(1, 2))[bin_ids]
+    return ~inside
+
+
+def _circles_of_four(
+    support: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Smallest circle enclosing four points per row (duplicates allowed),
+    # chosen among diametral circles of pairs and circumcircles of triples.
+    n = len(support)
+    centers = []
+    radii2 = []
+    for i, j in _PAIRS:
+        c = (support[:, i] + support[:, j]) / 2
+        centers.append(c)
+        radii2.append(((support[:, i] - c) ** 2).sum(axis=1))
+    for i, j, k in _TRIPLES:
+        a, b, c = support[:, i], support[:, j], support[:, k]
+        ab, ac = b - a, c - a
+        d = 2 * (ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0])
+        ok = np.abs(d) > 0
+        d = np.where(ok, d, 1.0)
+        ab2, ac2 = (ab**2).sum(axis=1), (ac**2).sum(axis=1)
+        ux = (ac[:, 1] * ab2 - ab[:, 1] * ac2) / d
+        uy = (ab[:, 0] * ac2 - ac[:, 0] * ab2) / d
+        center = a + np.column_stack([ux, uy])
+        r2 = ux**2 + uy**2
+        centers.append(center)
+        radii2.append(np.where(ok, r2, np.inf))
+
+    centers = np.stack(centers, axis=1)
+    radii2 = np.stack(radii2, axis=1)
+    dist2 = ((support[:, None, :, :] - centers[:, :, None, :]) ** 2).sum(axis=3)
+    covers = (dist2 <= radii2[:, :, None] * (1 + _MEC_RTOL) + 1e-12).all(axis=2)
+    radii2 = np.where(covers, radii2, np.inf)
+    best = np.argmin(radii2, axis=1)
+    rows = np.arange(n)
+    return centers[rows, best], radii2[rows, best], best
+
+
+def _support_points(support: np.ndarray, best: np.ndarray) -> np.ndarray:
+    # Rebuild a four-slot support set from the winning pair/triple.
+    index = np.array(
+        [[i, j, j, j] for i, j in _PAIRS] + [[i, j, k, k] for i, j, k in _TRIPLES]
+    )
+    rows = np.arange(len(support))[:, None]
+    return support[rows, index[best]]
+
+
+def minimum_enclosing_circles(
+    points: np.ndarray, offsets: np.ndarray, max_iter: int = 1000
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Exact minimum enclosing circle of every bin of a concatenated points
+    # array; bin i is points[offsets[i]:offsets[i + 1]]. Interior points are
+    # pruned first, then all bins run the Elzinga-Hearn farthest-point
+    # iteration in lockstep. Empty bins give NaN.
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_bins = len(offsets) - 1
+    cx = np.full(n_bins, np.nan)
+    cy = np.full(n_bins, np.nan)
+    radius = np.full(n_bins, np.nan)
+
+    counts = np.diff(offsets)
+    active = np.flatnonzero(counts > 0)
+    if len(active) == 0:
+        return cx, cy, radius
+
+    bin_ids = np.repeat(np.arange(len(active)), counts[active])
+    pts = points[offsets[0] : offsets[-1]]
+    starts = np.searchsorted(bin_ids, np.arange(len(active)))
+    keep = _prune_interior(pts, bin_ids, starts)
+    pts, bin_ids = pts[keep], bin_ids[keep]
+    starts = np.searchsorted(bin_ids, np.arange(len(active)))
+
+    support = np.repeat(pts[starts][:, None, :], 4, axis=1)
+    center = pts[starts].copy()
+    r2 = np.zeros(len(active))
+    todo = np.ones(len(active), dtype=bool)
+
+    for _ in range(max_iter):
+        dist2 = ((pts - center[bin_ids]) ** 2).sum(axis=1)
+        far = _segment_argmax(dist2, bin_ids, starts)
+        outside = dist2[far] > r2 * (1 + _MEC_RTOL) + 1e-12
+        todo &= outside
+        if not todo.any():
+            break
+        rows = np.flatnonzero(todo)
+        # The support never holds more than three distinct points, so the
+        # fourth slot takes the farthest point.
+        cand = support[rows].copy()
+        cand[:, 3] = pts[far[rows]]
+        c, rr, best = _circles_of_four(cand)
+        center[rows] = c
+        r2[rows] = rr
+        support[rows] = _support_points(cand, best)
+
+    cx[active] = center[:, 0]
+    cy[active] = center[:, 1]
+    radius[active] = np.sqrt(r2)
+    return cx, cy, radius
+
 
 def mec_time_bins(
     mouse_df: pd.DataFrame,
@@ -15,7 +166,7 @@ def mec_time_bins(
     min_points: int,
     likelihood_thresh: Optional[float],
 ) -> pd.DataFrame:
-    df = mouse_df.copy()
+    df = mouse_df
 
     if max_minutes is not None:
         cutoff_frames = int(max_minutes * 60 * fps)
@@ -24,51 +175,64 @@ def mec_time_bins(
     if likelihood_thresh is not None and "likelihood" in df.columns:
         df = df[df["likelihood"] >= likelihood_thresh]
 
-    df = df.reset_index(drop=True)
-    df.index.name = "frame"
-
     frames_per_bin = int(bin_seconds * fps)
-    df["bin_id"] = df.index // frames_per_bin
-
-    rows = []
-    for b, chunk in df.groupby("bin_id"):
-        chunk = chunk.dropna(subset=["x", "y"])
-        if len(chunk) < min_points:
-            start_f = int(b * frames_per_bin)
-            end_f = int(min((b + 1) * frames_per_bin - 1, df.index.max()))
-            rows.append(
-                {
-                    "bin_id": b,
-                    "start_frame": start_f,
-                    "end_frame": end_f,
-                    "time_center_s": (start_f + end_f) / 2 / fps,
-                    "center_x": np.nan,
-                    "center_y": np.nan,
-                    "radius": np.nan,
-                    "area_cm2": np.nan,
-                    "n_points": len(chunk),
-                }
-            )
-            continue
-
-        pts = chunk[["x", "y"]].to_numpy().astype(np.float32).reshape(-1, 1, 2)
-        (cx, cy), r = cv2.minEnclosingCircle(pts)
-
-        start_f = int(chunk.index.min())
-        end_f = int(chunk.index.max())
-
-        rows.append(
-            {
-                "bin_id": b,
-                "start_frame": start_f,
-                "end_frame": end_f,
-                "time_center_s": (start_f + end_f) / 2 / fps,
-                "center_x": float(cx),
-                "center_y": float(cy),
-                "radius": float(r),
-                "area_cm2": float(np.pi * r**2),
-                "n_points": len(chunk),
-            }
+    n_frames = len(df)
+    n_bins = -(-n_frames // frames_per_bin)
+    columns = [
+        "bin_id",
+        "start_frame",
+        "end_frame",
+        "time_center_s",
+        "center_x",
+        "center_y",
+        "radius",
+        "area_cm2",
+        "n_points",
+    ]
+    if n_bins == 0:
+        return pd.DataFrame(columns=columns)
+
+    x = df["x"].to_numpy(dtype=np.float64)
+    y = df["y"].to_numpy(dtype=np.float64)
+    frame = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    bin_of = frame // frames_per_bin
+    n_points = np.bincount(bin_of, minlength=n_bins)
+    offsets = np.r_[0, np.cumsum(n_points)]
+
+    bin_id = np.arange(n_bins)
+    enough = n_points >= min_points
+    # Bins too sparse for a circle span the whole bin window.
+    start_frame = bin_id * frames_per_bin
+    end_frame = np.minimum((bin_id + 1) * frames_per_bin - 1, n_frames - 1)
+    if enough.any():
+        start_frame = np.where(
+            enough, frame[np.minimum(offsets[:-1], len(frame) - 1)], start_frame
         )
+        end_frame = np.where(enough, frame[np.maximum(offsets[1:] - 1, 0)], end_frame)
+
+    # Points are rounded to float32 as before so radii match cv2's.
+    pts = np.column_stack([x[frame], y[frame]]).astype(np.float32)
+    solve = np.flatnonzero(enough)
+    sub_points = pts[enough[bin_of]]
+    sub_offsets = np.r_[0, np.cumsum(n_points[solve])]
+    cx = np.full(n_bins, np.nan)
+    cy = np.full(n_bins, np.nan)
+    radius = np.full(n_bins, np.nan)
+    cx[solve], cy[solve], radius[solve] = minimum_enclosing_circles(
+        sub_points, sub_offsets
+    )
 
-    return pd.DataFrame(rows).sort_values("bin_id").reset_index(drop=True)
+    return pd.DataFrame(
+        {
+            "bin_id": bin_id,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "time_center_s": (start_frame + end_frame) / 2 / fps,
+            "center_x": cx,
+            "center_y": cy,
+            "radius": radius,
+            "area_cm2": np.pi * radius**2,
+            "n_points": n_points,
+        },
+        columns=columns,
+    )
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dosedynamics.preprocessing.bodypart import extract_body_part
+
+POSE_COLUMNS = ("x", "y", "likelihood")
+
+
+# One session of one body part: metadata once, per-frame values as arrays.
+# columns holds any further per-frame arrays (e.g. the frame features).
+class SessionTrajectory:
+    __slots__ = ("meta", "x", "y", "likelihood", "columns")
+
+    def __init__(
+        self,
+        meta: Dict[str, Any],
+        x: np.ndarray,
+        y: np.ndarray,
+        likelihood: np.ndarray,
+        columns: Optional[Dict[str, np.ndarray]] = None,
+    ) -> None:
+        self.meta = meta
+        self.x = x
+        self.y = y
+        self.likelihood = likelihood
+        self.columns = columns or {}
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name in POSE_COLUMNS:
+            return getattr(self, name)
+        return self.columns[name]
+
+    def take(self, rows: np.ndarray) -> "SessionTrajectory":
+        return SessionTrajectory(
+            self.meta,
+            self.x[rows],
+            self.y[rows],
+            self.likelihood[rows],
+            {name: values[rows] for name, values in self.columns.items()},
+        )
+
+    def pose_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"x": self.x, "y": self.y, "likelihood": self.likelihood}, copy=False
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        data: Dict[str, Any] = dict(self.meta)
+        data.update(zip(POSE_COLUMNS, (self.x, self.y, self.likelihood)))
+        data.update(self.columns)
+        return pd.DataFrame(data, index=pd.RangeIndex(len(self)))
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        meta_cols: List[str],
+        dtype: Optional[np.dtype] = None,
+    ) -> "SessionTrajectory":
+        # df holds one session with flat columns, e.g. the output of
+        # extract_body_part or of frame_features.
+        meta = {col: df[col].iat[0] for col in meta_cols}
+        pose = [df[col].to_numpy(dtype=dtype) for col in POSE_COLUMNS]
+        columns = {
+            col: df[col].to_numpy()
+            for col in df.columns
+            if col not in POSE_COLUMNS and col not in meta
+        }
+        return cls(meta, *pose, columns)
+
+    @classmethod
+    def from_dlc(
+        cls,
+        df: pd.DataFrame,
+        body_part: str,
+        meta_cols: List[str],
+        dtype: Optional[np.dtype] = None,
+    ) -> "SessionTrajectory":
+        return cls.from_frame(
+            extract_body_part(df, body_part, meta_cols), meta_cols, dtype
+        )
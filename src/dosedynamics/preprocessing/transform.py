@@ -5,23 +5,44 @@ import numpy as np
 import pandas as pd
 
 
-def transform_dlc_coords_to_cm(df: pd.DataFrame, matrix: np.ndarray) -> pd.DataFrame:
-    df_cm = df.copy()
+def perspective_matrix(
+    corners: np.ndarray, width_cm: float, length_cm: float
+) -> np.ndarray:
+    # Homography from the arena corners in pixels (clockwise from top-left)
+    # to centimetres.
+    dst = np.array(
+        [[0, 0], [width_cm, 0], [width_cm, length_cm], [0, length_cm]],
+        dtype=np.float32,
+    )
+    return cv2.getPerspectiveTransform(corners.astype(np.float32), dst)
+
+
+def project_points(xy: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    # Applies the 3x3 projection in place to a contiguous array xy whose first
+    # axis holds the x and y planes, shape (2, ...).
+    flat = xy.reshape(2, -1)
+    homogeneous = matrix[:, :2] @ flat
+    homogeneous += matrix[:, 2:]
+    np.divide(homogeneous[:2], homogeneous[2], out=flat)
+    return xy
 
-    xy_cols_mask = df_cm.columns.get_level_values("coords").isin(["x", "y"])
-    xy_df = df_cm.loc[:, xy_cols_mask]
 
-    n_frames = len(df_cm)
-    n_xy_cols = xy_df.shape[1]
-    if n_xy_cols % 2 != 0:
+def transform_dlc_coords_to_cm(df: pd.DataFrame, matrix: np.ndarray) -> pd.DataFrame:
+    # Transforms the x/y pose columns of df in place; likelihood and metadata
+    # columns are left alone.
+    coords = df.columns.get_level_values("coords")
+    x_pos = np.flatnonzero(coords == "x")
+    y_pos = np.flatnonzero(coords == "y")
+    if len(x_pos) != len(y_pos):
         raise ValueError("Number of x/y columns must be even")
-
-    pts = xy_df.to_numpy().astype(np.float32)
-    pts = pts.reshape(-1, 2)
-    pts = pts.reshape(-1, 1, 2)
-
-    new_pts = cv2.perspectiveTransform(pts, matrix).reshape(-1, 2)
-    new_xy = new_pts.reshape(n_frames, n_xy_cols)
-    df_cm.loc[:, xy_cols_mask] = new_xy
-
-    return df_cm
+    if not len(x_pos):
+        return df
+
+    # pandas keeps columns contiguous, so the x/y columns are gathered as one
+    # (2 x body parts x frames) array, projected and written back.
+    pos = np.r_[x_pos, y_pos]
+    dtype = np.result_type(*df.dtypes.iloc[pos])
+    xy = np.ascontiguousarray(df.iloc[:, pos].to_numpy(dtype=np.float64).T)
+    project_points(xy.reshape(2, len(x_pos), len(df)), matrix)
+    df.iloc[:, pos] = xy.T.astype(dtype, copy=False)
+    return df
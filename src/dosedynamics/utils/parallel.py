@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def resolve_jobs(jobs: int) -> int:
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def ordered_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    jobs: int = 1,
+    max_pending: int | None = None,
+) -> Iterator[R]:
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        yield from map(func, items)
+        return
+
+    # Results are yielded in submission order, and at most max_pending items
+    # are in flight so a lazy input (e.g. streamed sessions) stays bounded.
+    max_pending = max_pending or 2 * jobs
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: deque = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def process_pool(jobs: int) -> ContextManager[Optional[Executor]]:
+    # A process pool, or None to run everything in this process.
+    jobs = resolve_jobs(jobs)
+    return ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()
+
+
+def submit(
+    pool: Optional[Executor], func: Callable[..., R], *args: Any, **kwargs: Any
+) -> "Future[R]":
+    if pool is not None:
+        return pool.submit(func, *args, **kwargs)
+    future: "Future[R]" = Future()
+    future.set_result(func(*args, **kwargs))
+    return future
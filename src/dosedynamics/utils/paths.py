@@ -20,6 +20,9 @@ class PathManager:
     def data_interim_dir(self) -> Path:
         return self.resolve(self.cfg.paths.data_interim_dir)
 
+    def cache_dir(self) -> Path:
+        return self.data_interim_dir() / self.cfg.cache.dir_name
+
     def data_processed_dir(self) -> Path:
         return self.resolve(self.cfg.paths.data_processed_dir)
 
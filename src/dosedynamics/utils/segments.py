@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+SEGMENT_STATS = ("sum", "count", "mean", "min", "max", "var")
+
+
+def segment_offsets(*keys: np.ndarray) -> np.ndarray:
+    # Boundaries of runs of equal keys (e.g. session, bin_id); rows must
+    # already be grouped so that each segment is contiguous.
+    n = len(keys[0]) if keys else 0
+    change = np.zeros(n, dtype=bool)
+    change[:1] = True
+    for key in keys:
+        key = np.asarray(key)
+        change[1:] |= key[1:] != key[:-1]
+    return np.r_[np.flatnonzero(change), n].astype(np.int64)
+
+
+def segment_reduce(
+    values: np.ndarray,
+    offsets: np.ndarray,
+    stats: Iterable[str] = SEGMENT_STATS,
+    ddof: int = 1,
+) -> Dict[str, np.ndarray]:
+    # Per-segment statistics of values (one column per feature if 2-D);
+    # segment i is values[offsets[i]:offsets[i + 1]]. NaNs are skipped as in
+    # pandas, and empty segments give 0 for sum/count and NaN otherwise.
+    stats = list(stats)
+    unknown = set(stats) - set(SEGMENT_STATS)
+    if unknown:
+        raise ValueError(f"Unknown segment statistics: {sorted(unknown)}")
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)[offsets[0] : offsets[-1]]
+    offsets = offsets - offsets[0]
+    lengths = np.diff(offsets)
+    nonempty = lengths > 0
+    starts = offsets[:-1][nonempty]
+    shape = (len(lengths),) + values.shape[1:]
+
+    def reduce(ufunc: np.ufunc, arr: np.ndarray, fill: float) -> np.ndarray:
+        out = np.full(shape, fill, dtype=arr.dtype)
+        if len(starts):
+            out[nonempty] = ufunc.reduceat(arr, starts, axis=0)
+        return out
+
+    missing = np.isnan(values)
+    count = reduce(np.add, (~missing).astype(np.int64), 0)
+    total = reduce(np.add, np.where(missing, 0.0, values), 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+
+    out: Dict[str, np.ndarray] = {}
+    for stat in stats:
+        if stat == "sum":
+            out[stat] = total
+        elif stat == "count":
+            out[stat] = count
+        elif stat == "mean":
+            out[stat] = mean
+        elif stat == "min":
+            out[stat] = reduce(np.fmin, values, np.nan)
+        elif stat == "max":
+            out[stat] = reduce(np.fmax, values, np.nan)
+        elif stat == "var":
+            segment = np.repeat(np.arange(len(lengths)), lengths)
+            dev = np.where(missing, 0.0, values - mean[segment])
+            squares = reduce(np.add, dev**2, 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[stat] = np.where(count > ddof, squares / (count - ddof), np.nan)
+    return out
@@ -0,0 +1,19 @@
+import numpy as np
+
+from dosedynamics.analysis.arrest import detect_arrests_batch, find_runs
+
+
+def test_find_runs_respects_session_boundaries():
+    flags = np.array([1, 1, 1, 0, 1, 1, 1, 1, 0, 1], dtype=bool)
+    session, start, end = find_runs(flags, np.array([0, 3, 6, 6, 10]), 2)
+    assert session.tolist() == [0, 1, 3]
+    assert start.tolist() == [0, 1, 0]
+    assert end.tolist() == [2, 2, 1]
+
+
+def test_detect_arrests_batch_durations():
+    flags = np.array([0, 1, 1, 1, 0, 1], dtype=bool)
+    arrests = detect_arrests_batch(flags, np.array([0, 6]), fps=2, min_still_seconds=1)
+    assert arrests["start_frame"].tolist() == [1]
+    assert arrests["end_frame"].tolist() == [3]
+    assert arrests["duration_s"].tolist() == [1.5]
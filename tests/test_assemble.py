@@ -0,0 +1,80 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from dosedynamics.config import load_config
+from dosedynamics.preprocessing.assemble import DLCCombinedBuilder
+
+
+def _write_inputs(root):
+    rng = np.random.default_rng(0)
+    videos = root / "videos"
+    videos.mkdir()
+    cols = pd.MultiIndex.from_tuples(
+        [
+            ("DLC", bp, c)
+            for bp in ("nose", "spine_2")
+            for c in ("x", "y", "likelihood")
+        ],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    corners = []
+    for i in range(5):
+        stem = f"2024010{i}_m{i}_"
+        df = pd.DataFrame(rng.uniform(0, 500, (50 + i, 6)), columns=cols)
+        df.to_hdf(videos / f"{stem}DLC_resnet_filtered.h5", key="df", mode="w")
+        for k, (x, y) in enumerate([(10, 10), (600, 15), (590, 480), (5, 470)]):
+            corners.append(
+                {"video_base": f"{stem}.mp4", "corner_idx": k, "x": x, "y": y}
+            )
+    pd.DataFrame(corners).to_hdf(root / "arena.h5", key="df", mode="w")
+
+
+def _assemble(root, name, jobs):
+    cfg = load_config(
+        "configs/default.yaml",
+        [
+            f"dataset_build.input_dir={root / 'videos'}",
+            f"dataset_build.arena_coords_h5={root / 'arena.h5'}",
+            f"dataset_build.output_h5={root / name}",
+            f"parallel.jobs={jobs}",
+        ],
+    )
+    DLCCombinedBuilder(cfg, logging.getLogger("test")).run()
+    return pd.read_hdf(root / name, key=cfg.dataset_build.output_key)
+
+
+def test_parallel_assemble_matches_serial(tmp_path):
+    _write_inputs(tmp_path)
+    serial = _assemble(tmp_path, "serial.h5", jobs=1)
+    parallel = _assemble(tmp_path, "parallel.h5", jobs=3)
+    assert len(serial) == sum(50 + i for i in range(5))
+    assert serial["animal_id"].unique().tolist() == [f"m{i}" for i in range(5)]
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert (tmp_path / "serial.h5.homographies.json").exists()
+
+
+def test_incremental_assemble_replaces_changed_files(tmp_path, caplog):
+    _write_inputs(tmp_path)
+    first = _assemble(tmp_path, "out.h5", jobs=1)
+
+    # Touched but unchanged files are skipped; nothing is appended twice.
+    videos = sorted((tmp_path / "videos").glob("*.h5"))
+    videos[0].touch()
+    with caplog.at_level(logging.INFO):
+        again = _assemble(tmp_path, "out.h5", jobs=1)
+    assert "skipped 5 unchanged" in caplog.text
+    pd.testing.assert_frame_equal(first, again)
+    manifest = json.loads((tmp_path / "out.h5.manifest.json").read_text())
+    entry = manifest["files"][videos[0].name]
+    assert entry["mtime_ns"] == videos[0].stat().st_mtime_ns
+
+    # A rewritten file has its old rows replaced, not duplicated.
+    df = pd.read_hdf(videos[1], key="df")
+    df.iloc[:10].to_hdf(videos[1], key="df", mode="w")
+    changed = _assemble(tmp_path, "out.h5", jobs=1)
+    assert len(changed) == len(first) - 41
+    counts = changed["animal_id"].value_counts()
+    assert counts["m1"] == 10 and counts["m0"] == 50 and counts["m4"] == 54
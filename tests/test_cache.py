@@ -0,0 +1,61 @@
+import logging
+import os
+
+from dosedynamics.config import load_config
+from dosedynamics.io.cache import ArtifactCache
+
+
+def _cache(tmp_path, *overrides):
+    (tmp_path / "input.h5").write_bytes(b"dlc")
+    cfg = load_config(
+        "configs/default.yaml",
+        [f"paths.base_dir={tmp_path}", "input.h5_path=input.h5", *overrides],
+    )
+    return ArtifactCache(cfg, logging.getLogger("test"))
+
+
+def test_artifact_cache_reuses_entries(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    assert cache.get_or_compute("stage", {"a": 1}, compute) == {"value": 1}
+    assert cache.get_or_compute("stage", {"a": 1}, compute) == {"value": 1}
+    assert cache.get_or_compute("stage", {"a": 2}, compute) == {"value": 2}
+    assert len(calls) == 2
+
+
+def test_artifact_cache_evicts_by_size(tmp_path):
+    cache = _cache(tmp_path, "cache.max_size_mb=0")
+    cache.get_or_compute("stage", {"a": 1}, lambda: "x" * 1000)
+    assert list(cache.cache_dir.glob("*.pkl")) == []
+
+
+def test_artifact_cache_key_tracks_parquet_partitions(tmp_path):
+    store = tmp_path / "combined"
+    part = store / "date=20240101" / "animal_id=a" / "p0.parquet"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(b"rows")
+    (store / "_manifest.json").write_text("{}")
+    for hash_content in (False, True):
+        cfg = load_config(
+            "configs/default.yaml",
+            [
+                f"paths.base_dir={tmp_path}",
+                "input.h5_path=combined",
+                f"cache.hash_content={str(hash_content).lower()}",
+            ],
+        )
+        before = ArtifactCache(cfg, logging.getLogger("test")).key("stage", {})
+
+        # Rewriting a partition file changes the key; the manifest does not.
+        part.write_bytes(b"other rows")
+        stat = part.stat()
+        os.utime(part, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        after = ArtifactCache(cfg, logging.getLogger("test")).key("stage", {})
+        assert after != before
+        (store / "_manifest.json").write_text('{"files": {}}')
+        assert ArtifactCache(cfg, logging.getLogger("test")).key("stage", {}) == after
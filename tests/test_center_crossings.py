@@ -1,3 +1,6 @@
+import numpy as np
+
+from dosedynamics.analysis.center_crossings import count_center_crossings
 from dosedynamics.config import CenterCrossingsConfig
 
 
@@ -11,3 +14,12 @@ def test_center_crossings_config():
         ylabel="Count center crossings",
     )
     assert cfg.inner_frac == 0.4
+
+
+def test_count_center_crossings_batched():
+    # session 0: in, out, in, out, in -> 2 crossings; session 1 has one entry
+    ic = np.array([0, 1, 0, 1, 0, 1, 0, 1, 1], dtype=bool)
+    entries, exits, crossings = count_center_crossings(ic, np.array([0, 6, 9]))
+    assert entries.tolist() == [3, 1]
+    assert exits.tolist() == [2, 0]
+    assert crossings.tolist() == [2, 0]
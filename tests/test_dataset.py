@@ -0,0 +1,40 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from dosedynamics.config import load_config
+from dosedynamics.io import dataset
+from dosedynamics.io.dataset import DatasetStore
+
+
+def _dlc_frame(n_frames: int = 10) -> pd.DataFrame:
+    cols = pd.MultiIndex.from_tuples(
+        [("scorer", "spine_2", c) for c in ("x", "y", "likelihood")],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    df = pd.DataFrame(np.ones((n_frames, 3)), columns=cols)
+    for col in ("date", "animal_id", "concentration", "administration"):
+        df[col] = "a"
+    return df
+
+
+def test_dataset_store_loads_once(monkeypatch):
+    calls = []
+
+    def fake_load(path, *args, **kwargs):
+        calls.append(path)
+        return _dlc_frame()
+
+    monkeypatch.setattr(dataset, "load_dataset", fake_load)
+    cfg = load_config("configs/default.yaml", [])
+    store = DatasetStore(cfg, logging.getLogger("test"))
+
+    full = store.full()
+    body = store.body()
+    assert store.body() is body
+    assert store.full() is full
+    assert len(calls) == 1
+    assert store.loads == 1
+    assert store.reuses == 3
+    assert list(body.columns[-3:]) == ["x", "y", "likelihood"]
@@ -1,4 +1,11 @@
-from dosedynamics.analysis.features import build_feature_names
+import numpy as np
+import pandas as pd
+
+from dosedynamics.analysis.features import (
+    build_feature_names,
+    merge_stops,
+    stops_per_bin,
+)
 
 
 def test_build_feature_names():
@@ -6,3 +13,38 @@ def test_build_feature_names():
     assert "speed_cms" in names
     assert "dist_from_wall" in names
     assert "mec_radius" in names
+
+
+def test_stops_per_bin_counts_all_sessions():
+    stops = stops_per_bin(
+        session=np.array([0, 0, 1, 1, 1]),
+        start_frame=np.array([0, 9, 3, 4, 25]),
+        n_frames=np.array([20, 30]),
+        frames_per_bin=10,
+    )
+    assert stops["session"].tolist() == [0, 0, 1, 1, 1]
+    assert stops["bin_id"].tolist() == [0, 1, 0, 1, 2]
+    assert stops["stops_per_bin"].tolist() == [2, 0, 2, 0, 1]
+
+
+def test_merge_stops_inserts_before_metadata():
+    bin_df = pd.DataFrame(
+        {
+            "session": [0, 0],
+            "bin_id": [0, 1],
+            "speed_cms": [1.0, 2.0],
+            "animal_id": ["a", "a"],
+            "concentration": [0.0, 0.0],
+        }
+    )
+    stops = pd.DataFrame({"session": [0], "bin_id": [1], "stops_per_bin": [3]})
+    # meta_cols may name columns the bins do not carry.
+    out = merge_stops(bin_df, stops, ["animal_id", "concentration", "trial"])
+    assert list(out.columns) == [
+        "bin_id",
+        "speed_cms",
+        "stops_per_bin",
+        "animal_id",
+        "concentration",
+    ]
+    assert out["stops_per_bin"].tolist() == [0, 3]
@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+from dosedynamics.io.filters import filter_mask, parse_filter
+
+
+def test_parse_filter():
+    f = parse_filter("concentration in [C, H]")
+    assert (f.column, f.op, f.values) == ("concentration", "in", ("C", "H"))
+    f = parse_filter("date>=20240101")
+    assert (f.column, f.op, f.values) == ("date", ">=", ("20240101",))
+    with pytest.raises(ValueError):
+        parse_filter("concentration")
+
+
+def test_filter_mask():
+    df = pd.DataFrame(
+        {"concentration": ["C", "H", "S"], "date": ["20240101", "20240102", "20240103"]}
+    )
+    filters = [parse_filter("concentration not in S"), parse_filter("date>20240101")]
+    assert filter_mask(df, filters).tolist() == [False, True, False]
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from dosedynamics.io.shared import (
+    SharedTrajectoryStore,
+    session_frame,
+    session_trajectory,
+)
+from dosedynamics.preprocessing.frame_features import (
+    compute_frame_features,
+    first_valid,
+    within_cutoff,
+)
+from dosedynamics.preprocessing.trajectory import SessionTrajectory
+
+
+def _features() -> pd.DataFrame:
+    # Two interleaved sessions; frame 1 of session "a" is below threshold.
+    body = pd.DataFrame(
+        {
+            "animal_id": ["a", "b", "a", "b", "a", "b"],
+            "x": [1.0, 5.0, 9.0, 5.0, 4.0, 8.0],
+            "y": [1.0, 5.0, 9.0, 1.0, 5.0, 1.0],
+            "likelihood": [0.9, 0.9, 0.1, 0.9, 0.9, 0.9],
+        }
+    )
+    return compute_frame_features(
+        body,
+        ["animal_id"],
+        fps=10,
+        likelihood_threshold=0.5,
+        width_cm=10,
+        length_cm=10,
+        border_frac=0.15,
+        center_frac=0.5,
+    )
+
+
+def test_frame_features_per_session():
+    f = _features()
+    a = f[f["animal_id"] == "a"]
+    assert a["frame"].tolist() == [0, 1, 2]
+    assert a["valid"].tolist() == [True, False, True]
+    assert a["valid_rank"].tolist() == [0, -1, 1]
+    # Steps join consecutive valid frames of the same session only.
+    np.testing.assert_allclose(a["step_dist"], [np.nan, np.nan, 5.0])
+    np.testing.assert_allclose(f.loc[f["animal_id"] == "b", "speed"], [np.nan, 40, 30])
+    assert a["dist_from_wall"].tolist() == [1.0, 1.0, 4.0]
+    assert a["in_border"].tolist() == [True, True, False]
+    assert a["in_center"].tolist() == [False, False, True]
+
+    session = SessionTrajectory.from_frame(a, ["animal_id"])
+    assert session.meta == {"animal_id": "a"}
+    assert within_cutoff(session, 2)["frame"].tolist() == [0]
+    assert first_valid(session, 2)["frame"].tolist() == [0, 2]
+
+
+def test_shared_store_keeps_frame_columns():
+    f = _features()
+    with SharedTrajectoryStore(f, ["animal_id"], sort=True) as store:
+        for i, (_, g) in enumerate(f.groupby("animal_id")):
+            shared = session_frame(store.handle, i, store.session_meta[i])
+            pd.testing.assert_frame_equal(
+                shared.reset_index(drop=True), g.reset_index(drop=True)
+            )
+            traj = session_trajectory(
+                store.handle, i, store.session_meta[i], ["animal_id"]
+            )
+            pd.testing.assert_frame_equal(
+                traj.to_frame(), g.reset_index(drop=True), check_like=True
+            )
+            del shared, traj
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from dosedynamics.io.filters import parse_filters
+from dosedynamics.io.loaders import (
+    iter_dlc_csv,
+    iter_sessions,
+    load_dlc_csv,
+    load_partitioned,
+)
+from dosedynamics.io.savers import save_partitioned
+
+
+def _dlc_frame() -> pd.DataFrame:
+    cols = pd.MultiIndex.from_tuples(
+        [("scorer", bp, c) for bp in ("nose", "spine_2") for c in ("x", "y")],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    df = pd.DataFrame(np.arange(16, dtype=float).reshape(4, 4), columns=cols)
+    df["date"] = ["20240101", "20240101", "20240102", "20240102"]
+    df["animal_id"] = ["a", "a", "b", "b"]
+    df["concentration"] = ["C", "C", "H", "H"]
+    return df
+
+
+def test_partitioned_roundtrip(tmp_path):
+    save_partitioned(_dlc_frame(), tmp_path, ["date", "animal_id"], part_name="p0")
+
+    df = load_partitioned(tmp_path, ["date", "animal_id"])
+    assert df[("scorer", "spine_2", "x")].dtype == np.float32
+    assert df["concentration"].tolist() == ["C", "C", "H", "H"]
+
+    sub = load_partitioned(
+        tmp_path,
+        ["date", "animal_id"],
+        body_parts=["spine_2"],
+        coords=["y"],
+        meta_cols=["animal_id"],
+        filters=parse_filters(["animal_id in b", "concentration==H"]),
+    )
+    assert sub.columns.tolist() == [("scorer", "spine_2", "y"), ("animal_id", "", "")]
+    assert sub[("scorer", "spine_2", "y")].tolist() == [11.0, 15.0]
+
+
+def test_iter_sessions_partitioned(tmp_path):
+    save_partitioned(_dlc_frame(), tmp_path, ["date", "animal_id"], part_name="p0")
+
+    sessions = list(iter_sessions(tmp_path, ["date", "animal_id"], body_parts=["nose"]))
+    assert [len(g) for g in sessions] == [2, 2]
+    assert [g[("animal_id", "", "")].iat[0] for g in sessions] == ["a", "b"]
+
+
+def test_load_dlc_csv(tmp_path):
+    pose = pd.concat([_dlc_frame().iloc[:, :4]] * 10, ignore_index=True)
+    pose.loc[2, ("scorer", "nose", "y")] = np.nan
+    path = tmp_path / "video_DLC_filtered.csv"
+    pose.to_csv(path)
+
+    df = load_dlc_csv(path)
+    assert df.columns.names == ["scorer", "bodyparts", "coords"]
+    pd.testing.assert_frame_equal(df, pose.astype(np.float32))
+
+    # Tiny blocks stream the file in several chunks.
+    chunks = list(iter_dlc_csv(path, block_size=256))
+    assert len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
@@ -0,0 +1,26 @@
+import cv2
+import numpy as np
+
+from dosedynamics.preprocessing.mec import minimum_enclosing_circles
+
+
+def test_minimum_enclosing_circles_match_cv2():
+    rng = np.random.default_rng(0)
+    bins = [
+        rng.normal(0, 5, (rng.integers(1, 300), 2)).astype(np.float32)
+        for _ in range(50)
+    ]
+    offsets = np.r_[0, np.cumsum([len(b) for b in bins])]
+    cx, cy, radius = minimum_enclosing_circles(np.concatenate(bins), offsets)
+
+    for i, pts in enumerate(bins):
+        (ref_x, ref_y), ref_r = cv2.minEnclosingCircle(pts.reshape(-1, 1, 2))
+        assert abs(radius[i] - ref_r) < 1e-3
+        assert abs(cx[i] - ref_x) < 1e-3 and abs(cy[i] - ref_y) < 1e-3
+
+
+def test_minimum_enclosing_circles_empty_bin():
+    pts = np.array([[0, 0], [2, 0]], dtype=float)
+    cx, cy, radius = minimum_enclosing_circles(pts, np.array([0, 0, 2]))
+    assert np.isnan(radius[0])
+    assert radius[1] == 1.0 and cx[1] == 1.0 and cy[1] == 0.0
@@ -0,0 +1,13 @@
+from dosedynamics.utils.parallel import ordered_map, resolve_jobs
+
+
+def test_ordered_map_matches_serial():
+    items = list(range(-20, 20))
+    serial = list(ordered_map(abs, items, jobs=1))
+    parallel = list(ordered_map(abs, iter(items), jobs=2, max_pending=3))
+    assert parallel == serial == [abs(i) for i in items]
+
+
+def test_resolve_jobs():
+    assert resolve_jobs(3) == 3
+    assert resolve_jobs(0) >= 1
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from dosedynamics.utils.segments import segment_offsets, segment_reduce
+
+
+def test_segment_reduce_matches_groupby():
+    rng = np.random.default_rng(0)
+    session = np.repeat([0, 0, 1, 2], [5, 1, 7, 4])
+    bin_id = np.repeat([0, 1, 0, 0], [5, 1, 7, 4])
+    values = rng.normal(size=len(session))
+    values[[2, 5, 9]] = np.nan
+
+    offsets = segment_offsets(session, bin_id)
+    out = segment_reduce(values, offsets)
+    expected = (
+        pd.DataFrame({"s": session, "b": bin_id, "v": values})
+        .groupby(["s", "b"])["v"]
+        .agg(["sum", "count", "mean", "min", "max", "var"])
+    )
+    for stat in expected.columns:
+        np.testing.assert_allclose(out[stat], expected[stat], rtol=1e-12)
+
+
+def test_segment_reduce_empty_segments_and_columns():
+    values = np.array([[1.0, 10.0], [3.0, 30.0], [5.0, 50.0]])
+    out = segment_reduce(values, np.array([0, 2, 2, 3]), ("sum", "count", "mean"))
+    np.testing.assert_array_equal(out["sum"], [[4, 40], [0, 0], [5, 50]])
+    np.testing.assert_array_equal(out["count"], [[2, 2], [0, 0], [1, 1]])
+    assert np.isnan(out["mean"][1]).all()
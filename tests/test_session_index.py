@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from dosedynamics.io.session_index import build_session_index
+
+
+def test_session_index_frames_and_window():
+    df = pd.DataFrame(
+        {
+            "animal_id": ["b", "a", "b", "a", None, "a"],
+            "x": np.arange(6.0),
+        }
+    )
+    index = build_session_index(df, ["animal_id"])
+    assert index.n_sessions == 2
+    assert index.lengths.tolist() == [3, 2]
+    assert index.order.tolist() == [1, 3, 5, 0, 2]
+    assert index.frame.tolist() == [0, 0, 1, 1, -1, 2]
+
+    cut = df[index.window(stop=2)]
+    expected = df[df["animal_id"].notna()].groupby("animal_id").head(2)
+    pd.testing.assert_frame_equal(cut, expected)
+    assert df[index.window(1, 2)]["x"].tolist() == [2.0, 3.0]
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from dosedynamics.io.shared import (
+    SharedArray,
+    SharedTrajectoryStore,
+    attach_array,
+    session_frame,
+)
+
+
+def _dlc_frame() -> pd.DataFrame:
+    cols = pd.MultiIndex.from_tuples(
+        [
+            ("scorer", bp, c)
+            for bp in ("nose", "tail")
+            for c in ("x", "y", "likelihood")
+        ],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    df = pd.DataFrame(np.arange(36, dtype=float).reshape(6, 6), columns=cols)
+    df["date"] = ["d2", "d1", "d2", "d1", "d2", "d1"]
+    df["animal_id"] = ["b", "a", "b", "a", "b", "a"]
+    return df
+
+
+def test_shared_sessions_match_groupby():
+    df = _dlc_frame()
+    expected = [g for _, g in df.groupby(["date", "animal_id"], sort=False)]
+
+    with SharedTrajectoryStore(df, ["date", "animal_id"], sort=False) as store:
+        assert store.handle.n_sessions == 2
+        for (i, meta), g in zip(store.tasks(), expected):
+            shared = session_frame(store.handle, i, meta)
+            assert shared.columns.equals(g.columns)
+            np.testing.assert_array_equal(shared.to_numpy(), g.to_numpy(), strict=False)
+            del shared
+
+
+def test_shared_array_roundtrip():
+    X = np.arange(24, dtype=float).reshape(2, 3, 4)
+    with SharedArray(X) as shared:
+        view = attach_array(shared.handle)
+        np.testing.assert_array_equal(view, X)
+        assert not view.flags.writeable
+        del view
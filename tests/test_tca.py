@@ -0,0 +1,226 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dosedynamics.analysis.tca import (
+    align_factors,
+    build_tensor,
+    core_consistency,
+    cross_validate,
+    fill_tensor,
+    holdout_folds,
+    rank_sweep,
+    relative_error,
+    run_tca,
+    run_tca_restarts,
+)
+from dosedynamics.analysis.tca_per_animal import TCAPerAnimalAnalysis
+from dosedynamics.config import load_config
+
+
+def test_build_tensor_scatter():
+    bin_df = pd.DataFrame(
+        {
+            "group_id": ["b", "a", "a", "b", "a"],
+            "bin_id": [0, 1, 0, 2, 1],
+            "concentration": ["H", "C", "C", "H", "C"],
+            "speed_cms": [1.0, 2.0, 3.0, 4.0, 5.0],
+        }
+    )
+    X, meta, features, n_bins = build_tensor(
+        bin_df, ["speed_cms", "mec_radius"], "group_id", "bin_id"
+    )
+    assert meta == [
+        {"group_id": "a", "concentration": "C"},
+        {"group_id": "b", "concentration": "H"},
+    ]
+    assert n_bins == 3
+    np.testing.assert_array_equal(X[:, :, 0], [[3.0, 5.0, np.nan], [1.0, np.nan, 4.0]])
+    assert np.isnan(X[:, :, 1]).all()
+
+    masked, *_ = build_tensor(bin_df, features, "group_id", "bin_id", masked=True)
+    assert masked.mask[0, 2, 0] and not masked.mask[0, 0, 0]
+
+
+def _low_rank_tensor(rank=2, shape=(8, 12, 4), seed=0):
+    rng = np.random.default_rng(seed)
+    factors = [rng.uniform(0.1, 1.0, (n, rank)) for n in shape]
+    X = np.einsum("ir,jr,kr->ijk", *factors)
+    return X, factors
+
+
+def test_align_factors_undoes_permutation_and_signs():
+    _, factors = _low_rank_tensor(rank=3)
+    shuffled = [
+        -f[:, [2, 0, 1]] if m < 2 else f[:, [2, 0, 1]] for m, f in enumerate(factors)
+    ]
+    weights, aligned, similarity = align_factors(factors, shuffled)
+    for a, f in zip(aligned, factors):
+        np.testing.assert_allclose(a, f)
+    np.testing.assert_allclose(weights, 1.0)
+    assert similarity == pytest.approx(1.0)
+
+
+def test_run_tca_restarts_picks_best_fit():
+    X, _ = _low_rank_tensor()
+    kwargs = dict(
+        rank=2, max_iter=200, tol=1e-10, init="svd", normalize_factors=True, l2_reg=0.0
+    )
+    fit = run_tca_restarts(X, n_restarts=3, n_jobs=2, seed=7, **kwargs)
+    restarts = fit.restarts
+    assert restarts["init"].tolist() == ["svd", "random", "random"]
+    assert restarts["seed"].tolist() == [7, 8, 9]
+    best = restarts.loc[restarts["best"]].iloc[0]
+    assert best["error"] == restarts["error"].min() < 1e-3
+    assert best["similarity"] == pytest.approx(1.0)
+    assert (restarts["similarity"] > 0.99).all()
+
+    serial = run_tca_restarts(X, n_restarts=3, n_jobs=1, seed=7, **kwargs)
+    pd.testing.assert_frame_equal(serial.restarts, restarts)
+
+
+def test_rank_sweep_warm_starts_and_diagnostics():
+    X, factors = _low_rank_tensor()
+    assert core_consistency(X, np.ones(2), factors) == pytest.approx(100.0)
+
+    kwargs = dict(
+        max_iter=200, tol=1e-10, init="svd", normalize_factors=True, l2_reg=0.0
+    )
+    sweep = rank_sweep(X, max_rank=3, n_restarts=2, n_jobs=2, seed=1, **kwargs)
+    table = sweep.table
+    assert table["rank"].tolist() == [1, 2, 3]
+    assert table["error"].iloc[1] < 1e-3 < table["error"].iloc[0]
+    assert table["core_consistency"].iloc[1] == pytest.approx(100.0, abs=1e-3)
+    assert sweep.fits[2].restarts["init"].tolist() == ["warm", "random"]
+    assert sweep.fits[1].restarts["init"].tolist() == ["svd", "random"]
+
+    serial = rank_sweep(X, max_rank=3, n_restarts=2, n_jobs=1, seed=1, **kwargs)
+    pd.testing.assert_frame_equal(serial.table, table)
+
+
+def test_masked_tca_fits_observed_entries_only():
+    X, _ = _low_rank_tensor(rank=2, shape=(10, 15, 4))
+    missing = np.random.default_rng(1).random(X.shape) < 0.3
+    X_missing = np.where(missing, np.nan, X)
+    assert np.isnan(fill_tensor(X_missing, "mask", 0.0)[missing]).all()
+
+    weights, factors = run_tca(
+        X_missing,
+        rank=2,
+        max_iter=500,
+        tol=1e-12,
+        init="svd",
+        normalize_factors=True,
+        l2_reg=0.0,
+    )
+    # The held-back entries are recovered, unlike with median filling.
+    assert relative_error(X_missing, weights, factors) < 1e-4
+    assert relative_error(X, weights, factors) < 1e-4
+    assert np.allclose([np.linalg.norm(f, axis=0) for f in factors], 1.0)
+
+
+def test_cross_validate_held_out_error():
+    X, _ = _low_rank_tensor(rank=2, shape=(10, 15, 4))
+    X += np.random.default_rng(2).normal(0, 0.01, X.shape)
+    X[0, 0, 0] = np.nan
+
+    folds = holdout_folds(X, 4, seed=3)
+    assert folds[0, 0, 0] == -1
+    assert sorted(np.bincount(folds[folds >= 0])) == [149, 150, 150, 150]
+
+    kwargs = dict(
+        ranks=[1, 2],
+        n_folds=4,
+        max_iter=300,
+        tol=1e-10,
+        init="svd",
+        normalize_factors=True,
+        l2_reg=0.0,
+        seed=3,
+    )
+    cv = cross_validate(X, n_jobs=2, **kwargs)
+    assert cv[["rank", "fold"]].values.tolist() == [
+        [r, f] for r in (1, 2) for f in range(4)
+    ]
+    test_error = cv.groupby("rank")["test_error"].mean()
+    assert test_error[2] < 0.05 < test_error[1]
+    pd.testing.assert_frame_equal(cross_validate(X, n_jobs=1, **kwargs), cv)
+
+
+def _bin_df_with_gaps():
+    # Rank-2 bins of 8 groups x 10 bins x 3 features, 6 bins missing.
+    X, _ = _low_rank_tensor(rank=2, shape=(8, 10, 3))
+    groups, bins = np.meshgrid(range(8), range(10), indexing="ij")
+    bin_df = pd.DataFrame(
+        {
+            "group_id": [f"g{g}" for g in groups.ravel()],
+            "bin_id": bins.ravel(),
+            "concentration": "C",
+            "speed_cms": X[..., 0].ravel(),
+            "dist_from_wall": X[..., 1].ravel(),
+            "stops_per_bin": X[..., 2].ravel(),
+        }
+    )
+    return bin_df.drop(index=[3, 10, 11, 25, 47, 62]).reset_index(drop=True)
+
+
+def test_cross_validate_holds_out_observed_bins_only():
+    bin_df = _bin_df_with_gaps()
+    cfg = load_config(
+        "configs/default.yaml",
+        [
+            "analysis.tca.fill_strategy=median",
+            "analysis.tca.features.extra=[stops_per_bin]",
+            "analysis.tca.sweep_max_rank=2",
+            "analysis.tca.cv_folds=3",
+            "analysis.tca.init=random",
+            "analysis.tca.n_jobs=1",
+        ],
+    )
+    analysis = TCAPerAnimalAnalysis(cfg, logging.getLogger("test"), store=object())
+    folds = analysis.cross_validate(bin_df).folds
+
+    # Missing bins are neither fitted nor scored, so the median fill does not
+    # leak into the held-out error of the true rank.
+    test_error = folds.groupby("rank")["test_error"].mean()
+    assert test_error[2] < 1e-2 < test_error[1]
+    X_filled, *_ = analysis.prepare_tensor(bin_df)
+    tca_cfg = cfg.analysis.tca
+    filled = cross_validate(
+        X_filled,
+        ranks=[2],
+        n_folds=3,
+        max_iter=tca_cfg.max_iter,
+        tol=tca_cfg.tol,
+        init=tca_cfg.init,
+        normalize_factors=tca_cfg.normalize_factors,
+        l2_reg=tca_cfg.l2_reg,
+        seed=tca_cfg.seed,
+    )
+    assert filled["test_error"].mean() > 1e-2
+
+
+def test_masked_tca_run_reports_observed_error(caplog):
+    bin_df = _bin_df_with_gaps()
+    cfg = load_config(
+        "configs/default.yaml",
+        [
+            "analysis.tca.fill_strategy=mask",
+            "analysis.tca.features.extra=[stops_per_bin]",
+            "analysis.tca.rank=2",
+            "analysis.tca.init=random",
+            "analysis.tca.n_restarts=1",
+        ],
+    )
+    analysis = TCAPerAnimalAnalysis(cfg, logging.getLogger("test"), store=object())
+    with caplog.at_level(logging.INFO):
+        results = analysis.run(bin_df)
+
+    X_missing, *_ = analysis.prepare_tensor(bin_df)
+    error = results.restarts["error"].iloc[0]
+    assert error < 1e-3
+    assert f"relative error {error:.4f} over {X_missing.size - 18} fitted" in (
+        caplog.text
+    )
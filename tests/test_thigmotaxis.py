@@ -1,4 +1,9 @@
-from dosedynamics.config import ThigmotaxisConfig
+import logging
+
+import pytest
+
+from dosedynamics.analysis.thigmotaxis import ThigmotaxisAnalysis
+from dosedynamics.config import ThigmotaxisConfig, load_config
 
 
 def test_thigmotaxis_config_defaults():
@@ -11,3 +16,15 @@ def test_thigmotaxis_config_defaults():
         output_filename="thigmotaxis.png",
     )
     assert cfg.margin_frac == 0.25
+
+
+class _EmptyStore:
+    def map(self, func, **kwargs):
+        return iter(())
+
+
+def test_thigmotaxis_without_sessions():
+    cfg = load_config("configs/default.yaml", [])
+    analysis = ThigmotaxisAnalysis(cfg, logging.getLogger("test"), store=_EmptyStore())
+    with pytest.raises(ValueError, match="No thigmotaxis indices"):
+        analysis.run()
@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+import pandas as pd
+
+from dosedynamics.preprocessing.transform import (
+    perspective_matrix,
+    transform_dlc_coords_to_cm,
+)
+
+
+def test_transform_matches_cv2_in_place():
+    corners = np.array([[10, 10], [600, 15], [590, 480], [5, 470]])
+    matrix = perspective_matrix(corners, 40, 40)
+    cols = pd.MultiIndex.from_tuples(
+        [("DLC", bp, c) for bp in ("nose", "tail") for c in ("x", "y", "likelihood")],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(0, 600, (20, 6)), columns=cols)
+    df["animal_id"] = "m1"
+    likelihood = df.xs("likelihood", axis=1, level="coords").copy()
+
+    xy_cols = [c for c in cols if c[2] != "likelihood"]
+    pts = df[xy_cols].to_numpy()
+    expected = cv2.perspectiveTransform(pts.reshape(-1, 1, 2), matrix)
+
+    out = transform_dlc_coords_to_cm(df, matrix)
+    assert out is df
+    np.testing.assert_allclose(
+        df[xy_cols].to_numpy(),
+        expected.reshape(20, 4),
+    )
+    pd.testing.assert_frame_equal(
+        df.xs("likelihood", axis=1, level="coords"), likelihood
+    )
+    corners_cm = cv2.perspectiveTransform(
+        corners.reshape(-1, 1, 2).astype(float), matrix
+    )
+    np.testing.assert_allclose(
+        corners_cm.reshape(4, 2), [[0, 0], [40, 0], [40, 40], [0, 40]], atol=1e-6
+    )